@@ -0,0 +1,48 @@
+"""
+Per-message time of serializing a single object with the generic DRF
+field loop and with `Meta.compiled`.
+
+    python -m benchmarks.bench_compiled
+"""
+import timeit
+
+from benchmarks.bench_field_plan import (
+    CachedUserProfileSerializer,
+    MainDemultiplexer,
+    User,
+    UserProfile,
+    Team
+)
+
+
+class CompiledUserProfileSerializer(CachedUserProfileSerializer):
+    class Meta(CachedUserProfileSerializer.Meta):
+        compiled = True
+
+
+def main(number=2000):
+    profile = UserProfile.objects.create(
+        user=User.objects.create(username='bob'),
+        team=Team.objects.create(name='The Team')
+    )
+    profile = UserProfile.objects.select_related('user', 'team').get(
+        pk=profile.pk
+    )
+    context = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+
+    for serializer_class in (CachedUserProfileSerializer,
+                             CompiledUserProfileSerializer):
+        serializer = serializer_class(instance=profile, context=context)
+        serializer.data
+
+        def representation():
+            return serializer.to_representation(profile)
+
+        seconds = min(timeit.repeat(representation, number=number, repeat=5))
+        print('{:<30} {:8.1f} us/object'.format(
+            serializer_class.__name__, seconds / number * 1e6
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-message overhead of serializing a single object, with and without
+`Meta.cache_fields`.
+
+    python -m benchmarks.bench_field_plan
+"""
+import timeit
+
+from benchmarks.setup import setup_django
+
+setup_django()
+
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer  # noqa
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer  # noqa
+
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer  # noqa
+from tests.models import User, UserProfile, Team  # noqa
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'created',
+            'user',
+            'team',
+            'friends'
+        )
+
+
+class CachedUserProfileSerializer(UserProfileSerializer):
+    class Meta(UserProfileSerializer.Meta):
+        cache_fields = True
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+
+
+class TeamConsumer(GenericAsyncAPIConsumer):
+    queryset = Team.objects.all()
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer,
+        'teams': TeamConsumer,
+        'profiles': UserProfileConsumer
+    }
+
+
+def main(number=2000):
+    profile = UserProfile.objects.create(
+        user=User.objects.create(username='bob'),
+        team=Team.objects.create(name='The Team')
+    )
+    profile = UserProfile.objects.select_related('user', 'team').get(
+        pk=profile.pk
+    )
+    context = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+
+    for serializer_class in (UserProfileSerializer,
+                             CachedUserProfileSerializer):
+        def message():
+            return serializer_class(instance=profile, context=context).data
+
+        message()
+        seconds = min(timeit.repeat(message, number=number, repeat=5))
+        print('{:<30} {:8.1f} us/message'.format(
+            serializer_class.__name__, seconds / number * 1e6
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""
+Load harness driving a hypermedia demultiplexer end to end, in process,
+with many concurrent websocket clients.
+
+Each client connects through channels' `WebsocketCommunicator` and sends a
+random mix of `retrieve`, paged `list` and follow requests (sending back a
+reference found in an earlier reply). The throughput and the p50/p95/p99
+latencies are reported per kind of request and overall.
+
+    python -m benchmarks.load
+    python -m benchmarks.load --clients 100 --requests 50 --mode compact
+    python -m benchmarks.load --mix retrieve=1,follow=3 --size 1000
+
+`--mode` is one of `plain` (references rendered as dicts), `lazy` (lazy
+references encoded by the consumers) or `compact` (clients negotiate the
+compact references subprotocol).
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.setup import setup_django
+
+setup_django()
+
+from channels.testing.websocket import WebsocketCommunicator  # noqa
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer  # noqa
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer  # noqa
+from djangochannelsrestframework.mixins import RetrieveModelMixin  # noqa
+
+from benchmarks.suite import create_data  # noqa
+from hypermediachannels.compact import COMPACT_SUBPROTOCOL  # noqa
+from hypermediachannels.consumers import (  # noqa
+    HyperMediaConsumerMixin, KeysetListModelMixin
+)
+from hypermediachannels.demultiplexer import HyperMediaDemultiplexerMixin  # noqa
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer  # noqa
+from tests.models import User, UserProfile, Team  # noqa
+
+MODES = ('plain', 'lazy', 'compact')
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username',
+            'profile'
+        )
+
+
+class TeamSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = Team
+        fields = (
+            '@id',
+            'name'
+        )
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'created',
+            'user',
+            'team',
+            'friends'
+        )
+
+
+class LoadConsumer(HyperMediaConsumerMixin, KeysetListModelMixin,
+                   RetrieveModelMixin, GenericAsyncAPIConsumer):
+    lazy_references = False
+    max_page_size = 100
+
+
+class UserConsumer(LoadConsumer):
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+
+
+class TeamConsumer(LoadConsumer):
+    queryset = Team.objects.all()
+    serializer_class = TeamSerializer
+
+
+class UserProfileConsumer(LoadConsumer):
+    queryset = UserProfile.objects.select_related('user', 'team')
+    serializer_class = UserProfileSerializer
+
+
+class MainDemultiplexer(HyperMediaDemultiplexerMixin,
+                        AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'teams': TeamConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi()
+    }
+
+
+def find_references(data: Any, found: List):
+    """
+    Collect the `retrieve` references (dicts or compact lists) in `data`.
+    """
+    if isinstance(data, dict):
+        payload = data.get('payload')
+        if 'stream' in data and isinstance(payload, dict):
+            if payload.get('action') == 'retrieve':
+                found.append(data)
+            return
+        for value in data.values():
+            find_references(value, found)
+    elif isinstance(data, list):
+        if len(data) > 3 and all(isinstance(index, int) for index in data):
+            found.append(data)
+            return
+        for value in data:
+            find_references(value, found)
+
+
+class Client:
+    """
+    A simulated client sending requests one after the other.
+    """
+
+    def __init__(self, number: int, mode: str, pks: List[int],
+                 mix: List[Tuple[str, int]], timeout: float):
+        self.random = random.Random(number)
+        self.mode = mode
+        self.pks = pks
+        self.kinds = [kind for (kind, _) in mix]
+        self.weights = [weight for (_, weight) in mix]
+        self.timeout = timeout
+        self.request_id = 0
+        self.dictionary = None  # type: Optional[Dict[str, List]]
+        self.references = []  # type: List
+        self.latencies = defaultdict(list)  # type: Dict[str, List[float]]
+        self.errors = 0
+
+    async def connect(self):
+        subprotocols = [COMPACT_SUBPROTOCOL] if self.mode == 'compact' else []
+        self.communicator = WebsocketCommunicator(
+            MainDemultiplexer.as_asgi(), '/', subprotocols=subprotocols
+        )
+        connected, _ = await self.communicator.connect(timeout=self.timeout)
+        assert connected, 'could not connect'
+        if self.mode == 'compact':
+            message = await self.communicator.receive_json_from(self.timeout)
+            self.dictionary = message['@hypermedia']
+
+    async def disconnect(self):
+        await self.communicator.disconnect()
+
+    def decode(self, reference: Any) -> Dict:
+        if isinstance(reference, dict):
+            return reference
+        (stream, action, shape), values = reference[:3], reference[3:]
+        payload = {'action': self.dictionary['actions'][action]}
+        payload.update(zip(self.dictionary['shapes'][shape], values))
+        return {
+            'stream': self.dictionary['streams'][stream],
+            'payload': payload
+        }
+
+    def next_request(self) -> Tuple[str, str, Dict]:
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        if kind == 'follow' and self.references:
+            reference = self.decode(self.random.choice(self.references))
+            return kind, reference['stream'], dict(reference['payload'])
+        if kind == 'list':
+            return kind, 'profiles', {'action': 'list', 'page_size': 20}
+        return 'retrieve', 'profiles', {
+            'action': 'retrieve', 'pk': self.random.choice(self.pks)
+        }
+
+    async def request(self, stream: str, payload: Dict) -> Dict:
+        self.request_id += 1
+        payload['request_id'] = self.request_id
+        await self.communicator.send_json_to({
+            'stream': stream, 'payload': payload
+        })
+        while True:
+            message = await self.communicator.receive_json_from(self.timeout)
+            reply = message.get('payload', {})
+            if reply.get('request_id') == self.request_id:
+                return reply
+
+    async def run(self, requests: int, timed: bool = True):
+        for _ in range(requests):
+            kind, stream, payload = self.next_request()
+            start = time.perf_counter()
+            reply = await self.request(stream, payload)
+            elapsed = time.perf_counter() - start
+
+            if reply.get('response_status', 500) >= 400:
+                self.errors += 1
+            self.references = []
+            find_references(reply.get('data'), self.references)
+            if timed:
+                self.latencies[kind].append(elapsed)
+
+
+def percentiles(latencies: List[float]) -> Tuple[float, float, float]:
+    """
+    The p50, p95 and p99 of `latencies`, in ms.
+    """
+    if len(latencies) < 2:
+        return (latencies[0] * 1e3,) * 3 if latencies else (0, 0, 0)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return cuts[49] * 1e3, cuts[94] * 1e3, cuts[98] * 1e3
+
+
+async def run_load(pks: List[int], clients: int, requests: int,
+                   warmup: int, mode: str, mix: List[Tuple[str, int]],
+                   timeout: float) -> Tuple[List[Client], float]:
+    LoadConsumer.lazy_references = mode == 'lazy'
+    load = [
+        Client(number, mode, pks, mix, timeout) for number in range(clients)
+    ]
+    await asyncio.gather(*(client.connect() for client in load))
+
+    # neither connecting nor the warmup requests are timed
+    await asyncio.gather(*(client.run(warmup, False) for client in load))
+    start = time.perf_counter()
+    await asyncio.gather(*(client.run(requests) for client in load))
+    elapsed = time.perf_counter() - start
+
+    await asyncio.gather(*(client.disconnect() for client in load))
+    return load, elapsed
+
+
+def report(load: List[Client], elapsed: float):
+    latencies = defaultdict(list)  # type: Dict[str, List[float]]
+    for client in load:
+        for (kind, values) in client.latencies.items():
+            latencies[kind].extend(values)
+            latencies['all'].extend(values)
+
+    total = len(latencies['all'])
+    print('{} requests in {:.2f} s, {:.1f} requests/s, {} errors'.format(
+        total, elapsed, total / elapsed, sum(c.errors for c in load)
+    ))
+    print('{:<10} {:>8} {:>10} {:>10} {:>10}'.format(
+        '', 'count', 'p50 ms', 'p95 ms', 'p99 ms'
+    ))
+    for kind in sorted(latencies, key=lambda kind: kind == 'all'):
+        print('{:<10} {:>8} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+            kind, len(latencies[kind]), *percentiles(latencies[kind])
+        ))
+
+
+def parse_mix(value: str) -> List[Tuple[str, int]]:
+    mix = []
+    for item in value.split(','):
+        kind, _, weight = item.partition('=')
+        if kind not in ('retrieve', 'list', 'follow'):
+            raise argparse.ArgumentTypeError(
+                'unknown kind of request {!r}'.format(kind)
+            )
+        mix.append((kind, int(weight or 1)))
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=20,
+                        help='number of concurrent clients')
+    parser.add_argument('--requests', type=int, default=50,
+                        help='timed requests sent by each client')
+    parser.add_argument('--warmup', type=int, default=2,
+                        help='untimed requests sent by each client first')
+    parser.add_argument('--size', type=int, default=100,
+                        help='number of profiles')
+    parser.add_argument('--mode', choices=MODES, default='plain')
+    parser.add_argument('--mix', type=parse_mix,
+                        default='retrieve=5,list=2,follow=3',
+                        help='weights of the kinds of requests')
+    parser.add_argument('--timeout', type=float, default=30,
+                        help='seconds to wait for each reply')
+    args = parser.parse_args()
+
+    create_data(args.size)
+    pks = list(UserProfile.objects.values_list('pk', flat=True))
+    load, elapsed = asyncio.run(run_load(
+        pks, args.clients, args.requests, args.warmup, args.mode, args.mix,
+        args.timeout
+    ))
+    report(load, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import django
+from django.conf import settings
+
+
+def setup_django():
+    """
+    Configure Django like `tests/conftest.py` and create the tables for the
+    test models in an in-memory database, shared by all threads so that
+    `database_sync_to_async` sees the same data.
+    """
+    if settings.configured:
+        return
+
+    settings.configure(
+        INSTALLED_APPS=(
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'django.contrib.sessions',
+            'channels',
+            'tests'
+        ),
+        SECRET_KEY='dog',
+
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': 'file:benchmarks?mode=memory&cache=shared'
+            }
+        },
+        CHANNEL_LAYERS={
+            'default': {
+                'BACKEND': 'channels.layers.InMemoryChannelLayer'
+            }
+        },
+    )
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', run_syncdb=True, verbosity=0)
@@ -0,0 +1,290 @@
+"""
+Benchmark suite for hypermedia serialization and dereferencing over the
+test models, at several data sizes and demultiplexer sizes.
+
+For every scenario it reports the time per operation, the peak memory
+allocated by one operation and the number of queries it runs.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 10,1000 --streams 3,50 -k many
+    python -m benchmarks.suite --save before.json
+    python -m benchmarks.suite --compare before.json
+"""
+import argparse
+import json
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from benchmarks.setup import setup_django
+
+setup_django()
+
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer  # noqa
+from django.db import connection  # noqa
+from django.test.utils import CaptureQueriesContext  # noqa
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer  # noqa
+from djangochannelsrestframework.mixins import RetrieveModelMixin  # noqa
+
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer  # noqa
+from tests.models import User, UserProfile, Team  # noqa
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username',
+            'profile'
+        )
+
+        extra_kwargs = {
+            'profile': {
+                'kwarg_mappings': {
+                    'user_pk': 'self.pk',
+                }
+            },
+        }
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'created',
+            'user',
+            'team',
+            'friends'
+        )
+
+
+class UserConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+
+
+class TeamConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = Team.objects.all()
+
+
+class UserProfileConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+def make_demultiplexer(streams: int) -> type:
+    """
+    A demultiplexer with the user, team and profile streams followed by
+    `streams - 3` more streams for teams (never chosen, since the first
+    stream wins ties).
+    """
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'teams': TeamConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi()
+    }
+    for index in range(streams - len(applications)):
+        applications['teams_{}'.format(index)] = TeamConsumer.as_asgi()
+
+    return type(
+        'Demultiplexer{}'.format(streams),
+        (AsyncJsonWebsocketDemultiplexer,),
+        {'applications': applications}
+    )
+
+
+def create_data(size: int):
+    UserProfile.objects.all().delete()
+    User.objects.all().delete()
+    Team.objects.all().delete()
+
+    team = Team.objects.create(name='The Team')
+    users = User.objects.bulk_create(
+        User(username='user{}'.format(index)) for index in range(size)
+    )
+    UserProfile.objects.bulk_create(
+        UserProfile(user=user, team=team) for user in users
+    )
+    profiles = list(UserProfile.objects.order_by('pk'))
+    profiles[0].friends.set(profiles[1:])
+
+
+# a scenario builds the operation to measure from the data size and
+# the serializer context
+Scenario = Callable[[int, Dict], Callable[[], object]]
+
+
+def single_object(size: int, context: Dict):
+    profile = UserProfile.objects.select_related('user', 'team').first()
+    return lambda: UserProfileSerializer(
+        instance=profile, context=context
+    ).data
+
+
+def many_list(size: int, context: Dict):
+    queryset = UserProfile.objects.order_by('pk')
+    return lambda: UserProfileSerializer(
+        instance=queryset.all(), many=True, context=context
+    ).data
+
+
+def forward_reference(size: int, context: Dict):
+    profile = UserProfile.objects.select_related('user').first()
+    field = UserProfileSerializer(
+        instance=profile, context=context
+    ).fields['user']
+    return lambda: field.to_representation(profile.user)
+
+
+def backward_reference(size: int, context: Dict):
+    user = User.objects.first()
+    field = UserSerializer(instance=user, context=context).fields['profile']
+    return lambda: field.to_representation(field.get_attribute(user))
+
+
+def many_reference(size: int, context: Dict):
+    profile = UserProfile.objects.order_by('pk').first()
+    field = UserProfileSerializer(
+        instance=profile, context=context
+    ).fields['friends']
+    return lambda: field.to_representation(field.get_attribute(profile))
+
+
+def internal_pks(size: int, context: Dict):
+    pks = list(UserProfile.objects.values_list('pk', flat=True))
+    field = UserProfileSerializer(context=context).fields['friends']
+    return lambda: field.to_internal_value(pks)
+
+
+def internal_references(size: int, context: Dict):
+    references = [
+        {'stream': 'profiles', 'payload': {'action': 'retrieve', 'pk': pk}}
+        for pk in UserProfile.objects.values_list('pk', flat=True)
+    ]
+    field = UserProfileSerializer(context=context).fields['friends']
+    return lambda: field.to_internal_value(references)
+
+
+SCENARIOS = (
+    ('single_object', single_object),
+    ('many_list', many_list),
+    ('forward_reference', forward_reference),
+    ('backward_reference', backward_reference),
+    ('many_reference', many_reference),
+    ('internal_pks', internal_pks),
+    ('internal_references', internal_references),
+)  # type: Tuple[Tuple[str, Scenario], ...]
+
+
+class Result(NamedTuple):
+    scenario: str
+    size: int
+    streams: int
+    us: float
+    peak_kib: float
+    queries: int
+
+    @property
+    def key(self) -> str:
+        return '{}[{}x{}]'.format(self.scenario, self.size, self.streams)
+
+
+def measure(operation: Callable[[], object], budget: float = 0.2,
+            repeat: int = 5) -> Tuple[float, float, int]:
+    """
+    The best time per call (in µs), the peak memory allocated by one call
+    (in KiB) and the number of queries of one call.
+    """
+    operation()
+
+    with CaptureQueriesContext(connection) as queries:
+        operation()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timer = timeit.Timer(operation)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * budget / max(elapsed, 1e-9)))
+    best = min(timer.repeat(number=number, repeat=repeat))
+
+    return best / number * 1e6, peak / 1024, len(queries)
+
+
+def run(sizes: List[int], streams: List[int],
+        pattern: str = '') -> List[Result]:
+    results = []
+    for size in sizes:
+        create_data(size)
+        for count in streams:
+            context = {'scope': {
+                'demultiplexer_cls': make_demultiplexer(count)
+            }}
+            for (name, scenario) in SCENARIOS:
+                if pattern not in name:
+                    continue
+                us, peak_kib, queries = measure(scenario(size, context))
+                result = Result(name, size, count, us, peak_kib, queries)
+                results.append(result)
+                print('{:<32} {:>10.1f} us {:>8.1f} KiB {:>4} queries'.format(
+                    result.key, us, peak_kib, queries
+                ))
+    return results
+
+
+def compare(results: List[Result], baseline: Dict[str, Dict]):
+    print()
+    print('{:<32} {:>10} {:>10} {:>9}'.format(
+        'compared to baseline', 'time', 'memory', 'queries'
+    ))
+    for result in results:
+        before = baseline.get(result.key)
+        if before is None:
+            continue
+        print('{:<32} {:>+9.1f}% {:>+9.1f}% {:>+9d}'.format(
+            result.key,
+            (result.us / before['us'] - 1) * 100,
+            (result.peak_kib / max(before['peak_kib'], 1e-9) - 1) * 100,
+            result.queries - before['queries']
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10,100,1000',
+                        help='comma separated numbers of profiles')
+    parser.add_argument('--streams', default='3,30',
+                        help='comma separated numbers of demultiplexer '
+                             'streams')
+    parser.add_argument('-k', dest='pattern', default='',
+                        help='only run scenarios containing this')
+    parser.add_argument('--save', help='write the results to a JSON file')
+    parser.add_argument('--compare',
+                        help='compare with results saved with --save')
+    args = parser.parse_args()
+
+    results = run(
+        [int(size) for size in args.sizes.split(',')],
+        [int(count) for count in args.streams.split(',')],
+        args.pattern
+    )
+
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump({
+                result.key: result._asdict() for result in results
+            }, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+from typing import Any, Callable
+
+from channels.db import database_sync_to_async
+from django.db.models import QuerySet
+
+try:
+    from django.core.exceptions import SynchronousOnlyOperation
+except ImportError:
+    # Django < 3.0 has no async safety checks, `func` is just called
+    class SynchronousOnlyOperation(Exception):
+        pass
+
+# Django 4.1+ `aget`, `ain_bulk`, `aiterator`, ...
+ASYNC_QUERYSETS = hasattr(QuerySet, 'ain_bulk')
+
+
+async def call_or_defer(func: Callable, *args) -> Any:
+    """
+    Call a read-only `func` on the event loop, only running it in a
+    database thread if it needs to query (eg. to load a deferred field or
+    an unfetched relation).
+    """
+    try:
+        return func(*args)
+    except SynchronousOnlyOperation:
+        return await database_sync_to_async(func)(*args)
+
+
+async def aiterate(queryset: QuerySet):
+    """
+    Iterate a queryset without blocking the event loop.
+    """
+    if ASYNC_QUERYSETS:
+        async for item in queryset:
+            yield item
+        return
+    for item in await database_sync_to_async(list)(queryset):
+        yield item
@@ -0,0 +1,173 @@
+from functools import partial
+from threading import RLock
+from typing import Any, Callable, Dict, List, Tuple, Union
+from weakref import WeakKeyDictionary
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer
+
+from hypermediachannels.references import ReferenceTemplate
+from hypermediachannels.resolution import get_consumer_class
+
+COMPACT_SUBPROTOCOL = 'hypermedia.compact'
+
+
+def _encode(prefix: List[int], values: Tuple[Any, ...]) -> List[Any]:
+    return prefix + list(values)
+
+
+class CompactCodec:
+    """
+    The stream, action and lookup key dictionary of a demultiplexer.
+
+    In compact form a reference is sent as the list
+    `[stream, action, shape, *values]` where the first three items index
+    into `dictionary['streams']`, `dictionary['actions']` and
+    `dictionary['shapes']` (the lookup keys of the payload).
+
+    Streams come from the demultiplexer's `applications`, actions and
+    shapes from the actions of its consumers and the hypermedia fields of
+    their `serializer_class`. References that do not fit the dictionary
+    are sent in their usual `{stream, payload}` form.
+    """
+
+    def __init__(self, demultiplexer_cls: type):
+        self.applications = demultiplexer_cls.applications
+        self._size = len(self.applications)
+
+        streams = list(self.applications)
+        actions = set()
+        shapes = set()
+        context = {'scope': {'demultiplexer_cls': demultiplexer_cls}}
+        for application in self.applications.values():
+            consumer_cls = get_consumer_class(application)
+            actions.update(getattr(consumer_cls, 'available_actions', ()))
+            serializer_cls = getattr(consumer_cls, 'serializer_class', None)
+            if serializer_cls is not None:
+                self._collect(
+                    serializer_cls(many=True, context=context),
+                    actions, shapes, set()
+                )
+
+        self.streams = streams
+        self.actions = sorted(actions)
+        self.shapes = sorted(shapes)
+        self._stream_indexes = {
+            stream: index for (index, stream) in enumerate(self.streams)
+        }
+        self._action_indexes = {
+            action: index for (index, action) in enumerate(self.actions)
+        }
+        self._shape_indexes = {
+            keys: index for (index, keys) in enumerate(self.shapes)
+        }
+
+    @classmethod
+    def _collect(cls, serializer: BaseSerializer, actions: set, shapes: set,
+                 seen: set):
+        # avoid a circular import
+        from hypermediachannels.fields import HyperChannelsApiMixin
+
+        if isinstance(serializer, HyperChannelsApiMixin):
+            actions.add(serializer.action_name)
+            shapes.add(serializer.reference_keys)
+
+        child = getattr(serializer, 'child', None)
+        if child is not None:
+            serializer = child
+        if type(serializer) in seen or \
+                not isinstance(serializer, BaseSerializer):
+            return
+        seen.add(type(serializer))
+
+        for field in serializer.fields.values():
+            if isinstance(field, HyperChannelsApiMixin):
+                actions.add(field.action_name)
+                shapes.add(field.reference_keys)
+            elif isinstance(field, BaseSerializer):
+                cls._collect(field, actions, shapes, seen)
+
+    def is_stale(self, applications: Dict[str, Any]) -> bool:
+        # cheap enough for every reference, changes keeping the same dict
+        # and number of streams need an explicit clear
+        return applications is not self.applications or \
+            len(applications) != self._size
+
+    @property
+    def dictionary(self) -> Dict[str, List]:
+        """
+        Sent once to each connection that negotiated compact references.
+        """
+        return {
+            'streams': list(self.streams),
+            'actions': list(self.actions),
+            'shapes': [list(keys) for keys in self.shapes]
+        }
+
+    def get_builder(self, template: ReferenceTemplate) -> Callable[
+            [Tuple[Any, ...]], Union[List, Dict]]:
+        """
+        A callable building compact references from lookup values, or
+        rendering them as dicts if the template is not in the dictionary.
+        """
+        stream = self._stream_indexes.get(template.stream)
+        action = self._action_indexes.get(template.action)
+        shape = self._shape_indexes.get(template.keys)
+        if stream is None or action is None or shape is None:
+            return template.render
+        return partial(_encode, [stream, action, shape])
+
+    def decode(self, data: List) -> Dict:
+        """
+        Turn a compact reference back into its `{stream, payload}` form.
+        """
+        if len(data) < 3 or not all(
+                isinstance(index, int) and not isinstance(index, bool) and
+                index >= 0 for index in data[:3]):
+            raise ValidationError(
+                detail='Must be of the format [stream, action, shape, ...]'
+            )
+        stream, action, shape = data[:3]
+        values = data[3:]
+        try:
+            stream = self.streams[stream]
+            action = self.actions[action]
+            keys = self.shapes[shape]
+        except IndexError:
+            raise ValidationError(detail='Unknown compact reference.')
+        if len(values) != len(keys):
+            raise ValidationError(
+                detail='Expected {} lookup values.'.format(len(keys))
+            )
+
+        payload = {'action': action}
+        payload.update(zip(keys, values))
+        return {
+            'stream': stream,
+            'payload': payload
+        }
+
+
+_codecs = WeakKeyDictionary()  # type: WeakKeyDictionary
+_lock = RLock()
+
+
+def get_compact_codec(demultiplexer_cls: type) -> CompactCodec:
+    """
+    Return the compact codec for a demultiplexer class, (re)building it if
+    its `applications` were replaced or resized since it was built.
+    """
+    codec = _codecs.get(demultiplexer_cls)
+    applications = demultiplexer_cls.applications
+    if codec is None or codec.is_stale(applications):
+        with _lock:
+            codec = _codecs.get(demultiplexer_cls)
+            if codec is None or codec.is_stale(applications):
+                codec = CompactCodec(demultiplexer_cls)
+                _codecs[demultiplexer_cls] = codec
+    return codec
+
+
+def clear_compact_codecs():
+    with _lock:
+        _codecs.clear()
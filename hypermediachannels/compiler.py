@@ -0,0 +1,187 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model
+from rest_framework.fields import Field, SkipField
+from rest_framework.relations import PKOnlyObject, RelatedField
+from rest_framework.serializers import BaseSerializer
+
+ATTRIBUTE = 'attribute'
+REFERENCE = 'reference'
+GENERIC = 'generic'
+
+
+def _generic(field: Field, instance: Any, ret: Dict, name: str):
+    """
+    DRF's per-field loop body, for fields that could not be compiled.
+    """
+    try:
+        attribute = field.get_attribute(instance)
+    except SkipField:
+        return
+
+    check_for_none = attribute.pk if isinstance(
+        attribute, PKOnlyObject
+    ) else attribute
+    if check_for_none is None:
+        ret[name] = None
+    else:
+        ret[name] = field.to_representation(attribute)
+
+
+def _get_model_field(model: Type[Model], attr: str):
+    try:
+        return model._meta.get_field(attr)
+    except FieldDoesNotExist:
+        return None
+
+
+def classify_field(field: Field, model: Type[Model]) -> Tuple[str, Any]:
+    """
+    Work out how a field can be compiled, returning the kind of field and
+    the attribute it reads (or `None` for the whole instance).
+    """
+    # avoid a circular import
+    from hypermediachannels.fields import (
+        HyperChannelsApiMixin,
+        HyperChannelsApiManyRelationField
+    )
+
+    if isinstance(field, (BaseSerializer, HyperChannelsApiManyRelationField)):
+        return GENERIC, None
+
+    source_attrs = field.source_attrs
+
+    if isinstance(field, HyperChannelsApiMixin):
+        if type(field).get_attribute is not RelatedField.get_attribute or \
+                type(field).to_representation is not \
+                HyperChannelsApiMixin.to_representation or \
+                field.use_pk_only_optimization():
+            return GENERIC, None
+        if not source_attrs:
+            return REFERENCE, None
+        if len(source_attrs) != 1:
+            return GENERIC, None
+        model_field = _get_model_field(model, source_attrs[0])
+        if model_field is None or not model_field.concrete or not (
+                model_field.many_to_one or model_field.one_to_one):
+            return GENERIC, None
+        return REFERENCE, source_attrs[0]
+
+    if type(field).get_attribute is not Field.get_attribute or \
+            len(source_attrs) != 1:
+        return GENERIC, None
+
+    model_field = _get_model_field(model, source_attrs[0])
+    if model_field is None or not model_field.concrete or \
+            model_field.is_relation:
+        return GENERIC, None
+    return ATTRIBUTE, source_attrs[0]
+
+
+def generate_source(plan: Tuple[Tuple[str, str, Any], ...]) -> str:
+    """
+    Generate the source of a `to_representation(instance, parent, ...)`
+    function for a serializer's readable fields.
+    """
+    lines = [
+        'def to_representation(instance, parent, fields, representers, '
+        'models, streams, lookups, builders):',
+        '    ret = {}'
+    ]
+    for (index, (name, kind, attr)) in enumerate(plan):
+        key = repr(name)
+        if kind == ATTRIBUTE:
+            lines += [
+                '    value = instance.{}'.format(attr),
+                '    ret[{}] = None if value is None else '
+                'representers[{}](value)'.format(key, index),
+            ]
+        elif kind == REFERENCE:
+            lines += [
+                '    value = instance.{}'.format(attr)
+                if attr is not None else '    value = instance',
+                '    if value is None:',
+                '        ret[{}] = None'.format(key),
+                '    elif value.__class__ is models[{0}] and '
+                'streams[{0}] is not None:'.format(index),
+                '        ret[{0}] = builders[{1}]('
+                'lookups[{1}].values(value, parent))'.format(key, index),
+                '    else:',
+                '        ret[{}] = representers[{}](value)'.format(key, index),
+            ]
+        else:
+            lines.append(
+                '    _generic(fields[{}], instance, ret, {})'.format(index, key)
+            )
+    lines.append('    return ret')
+    return '\n'.join(lines) + '\n'
+
+
+_functions = {}  # type: Dict[Tuple, Callable]
+
+
+def compile_plan(plan: Tuple[Tuple[str, str, Any], ...]) -> Callable:
+    function = _functions.get(plan)
+    if function is None:
+        namespace = {'_generic': _generic}
+        exec(compile(
+            generate_source(plan), '<hypermedia to_representation>', 'exec'
+        ), namespace)
+        function = namespace['to_representation']
+        _functions[plan] = function
+    return function
+
+
+class CompiledRepresentation:
+    """
+    A compiled `to_representation` bound to one serializer instance.
+
+    Hypermedia references to the model a field is expected to hold are
+    built with the stream resolved up front, everything else goes through
+    the field's own `to_representation`.
+    """
+
+    def __init__(self, serializer: BaseSerializer):
+        model = serializer.Meta.model
+        fields = list(serializer._readable_fields)
+
+        plan = []  # type: List[Tuple[str, str, Any]]
+        models = []  # type: List[Optional[Type[Model]]]
+        streams = []  # type: List[Optional[str]]
+        for field in fields:
+            kind, attr = classify_field(field, model)
+            if kind == REFERENCE and field.get_includes() is not None:
+                kind, attr = GENERIC, None
+            target = None
+            stream = None
+            if kind == REFERENCE:
+                target = model if attr is None else \
+                    model._meta.get_field(attr).related_model
+                stream, _ = field.resolve(target)
+            plan.append((field.field_name, kind, attr))
+            models.append(target)
+            streams.append(stream)
+
+        self.serializer = serializer
+        self.plan = tuple(plan)
+        self.function = compile_plan(self.plan)
+        self.arguments = (
+            tuple(fields),
+            tuple(field.to_representation for field in fields),
+            tuple(models),
+            tuple(streams),
+            tuple(
+                getattr(field, 'lookups', None) for field in fields
+            ),
+            tuple(
+                field.get_reference_builder(stream)
+                if kind == REFERENCE else None
+                for (field, (_, kind, _), stream) in zip(fields, plan, streams)
+            ),
+        )
+
+    def __call__(self, instance: Any) -> Dict:
+        return self.function(
+            instance, self.serializer.instance, *self.arguments
+        )
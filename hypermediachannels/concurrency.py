@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, local
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.db import close_old_connections, connections
+
+DEFAULT_MAX_WORKERS = 4
+
+# the result of a call and the exception it raised (if any)
+Outcome = Tuple[Any, Optional[BaseException]]
+
+_executors = {}  # type: Dict[int, ThreadPoolExecutor]
+_lock = Lock()
+_worker = local()
+
+
+def get_executor(
+        max_workers: int = DEFAULT_MAX_WORKERS) -> ThreadPoolExecutor:
+    """
+    The shared executor for lookups with at most `max_workers` threads.
+    """
+    executor = _executors.get(max_workers)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(max_workers)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix='hypermedia-lookup'
+                )
+                _executors[max_workers] = executor
+    return executor
+
+
+def can_run_concurrently() -> bool:
+    """
+    Other threads use their own connections, so they can not see the
+    uncommitted writes of a transaction open in this thread. Lookups
+    already running on a worker do not wait on other workers, that could
+    exhaust the pool.
+    """
+    if getattr(_worker, 'active', False):
+        return False
+    return not any(
+        connection.in_atomic_block for connection in connections.all()
+    )
+
+
+def _call(func: Callable[[], Any]) -> Outcome:
+    # each worker thread has its own connections, close them once they are
+    # too old as channels does for `database_sync_to_async`
+    close_old_connections()
+    _worker.active = True
+    try:
+        return func(), None
+    except Exception as exc:
+        return None, exc
+    finally:
+        _worker.active = False
+        close_old_connections()
+
+
+def gather(funcs: List[Callable[[], Any]],
+           max_workers: int = DEFAULT_MAX_WORKERS) -> List[Outcome]:
+    """
+    Call `funcs` concurrently, returning their outcomes in the order of
+    `funcs` whichever finishes first.
+
+    A single call runs in this thread, as do all of them when
+    `can_run_concurrently` is false.
+    """
+    if len(funcs) < 2 or not can_run_concurrently():
+        outcomes = []  # type: List[Outcome]
+        for func in funcs:
+            try:
+                outcomes.append((func(), None))
+            except Exception as exc:
+                outcomes.append((None, exc))
+        return outcomes
+
+    executor = get_executor(max_workers)
+    futures = [executor.submit(_call, func) for func in funcs]
+    return [future.result() for future in futures]
+
+
+def gather_results(funcs: List[Callable[[], Any]],
+                   max_workers: int = DEFAULT_MAX_WORKERS) -> List[Any]:
+    """
+    `gather` raising the exception of the first call (in the order of
+    `funcs`) that failed.
+    """
+    outcomes = gather(funcs, max_workers)
+    for (_, exc) in outcomes:
+        if exc is not None:
+            raise exc
+    return [result for (result, _) in outcomes]
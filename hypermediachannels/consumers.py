@@ -0,0 +1,133 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from channels.db import database_sync_to_async
+from djangochannelsrestframework.decorators import action
+from rest_framework import status
+
+from hypermediachannels.pagination import paginate_keyset
+from hypermediachannels.references import ReferenceJSONEncoder
+
+
+class HyperMediaConsumerMixin:
+    """
+    Mixin for a DCRF consumer whose hypermedia serializers return
+    `Reference` objects, written out as `{stream, payload}` only when the
+    consumer encodes its reply.
+    """
+
+    lazy_references = True
+
+    def get_serializer_context(self, **kwargs) -> Dict:
+        context = super().get_serializer_context(**kwargs)
+        context['lazy_references'] = self.lazy_references
+        return context
+
+    @classmethod
+    async def encode_json(cls, content) -> str:
+        return json.dumps(content, cls=ReferenceJSONEncoder)
+
+
+class StreamingListModelMixin:
+    """
+    Adds a `stream_list` action replying with the references of the
+    queryset in chunks.
+
+    Each chunk is sent as its own reply with a `206` status and data
+    `{'sequence': n, 'results': [...]}`, the last reply has a `200` status
+    and data `{'sequence': n, 'end': True}` where `n` is the number of
+    chunks sent.
+
+    Chunks are read one query at a time, paged on `stream_ordering` (see
+    `paginate_keyset`), so no database cursor is kept open between them.
+    """
+
+    stream_chunk_size = None  # type: Optional[int]
+    stream_ordering = 'pk'
+
+    def get_stream_chunk(self, cursor: Optional[str],
+                         kwargs: Dict) -> Tuple[List, Optional[str]]:
+        """
+        The references of a chunk and the cursor of the next one (`None`
+        for the last chunk).
+
+        `kwargs` are the action's kwargs, kept apart from `cursor` so that
+        a client can send a `cursor` of its own.
+        """
+        queryset = self.filter_queryset(self.get_queryset(**kwargs), **kwargs)
+        serializer = self.get_serializer(
+            instance=queryset, many=True, action_kwargs=kwargs
+        )
+        meta = serializer.child.Meta
+
+        chunk_size = self.stream_chunk_size
+        if chunk_size is None:
+            chunk_size = getattr(meta, 'stream_chunk_size', 1000)
+        if getattr(meta, 'apply_query_plan', True):
+            queryset = serializer.child.get_many_query_plan().apply(queryset)
+
+        page, next_cursor = paginate_keyset(
+            queryset, chunk_size, cursor, ordering=self.stream_ordering
+        )
+        return serializer.to_representation(page), next_cursor
+
+    @action()
+    async def stream_list(self, action: str, request_id: Optional[str] = None,
+                          **kwargs) -> Tuple[Dict, int]:
+        sequence = 0
+        cursor = None
+        while True:
+            chunk, cursor = await database_sync_to_async(
+                self.get_stream_chunk
+            )(cursor, kwargs)
+            if chunk:
+                await self.reply(
+                    action=action,
+                    data={'sequence': sequence, 'results': chunk},
+                    status=status.HTTP_206_PARTIAL_CONTENT,
+                    request_id=request_id
+                )
+                sequence += 1
+            if cursor is None:
+                break
+
+        return {'sequence': sequence, 'end': True}, status.HTTP_200_OK
+
+
+class KeysetListModelMixin:
+    """
+    A `list` action serving the pages requested by many references with a
+    `page_size` (see `paginate_keyset`).
+
+    Without a `page_size` the whole list is returned as with DCRF's
+    `ListModelMixin`, otherwise the reply data is
+    `{'results': [...], 'cursor': <cursor of the next page or None>}`.
+    """
+
+    page_ordering = 'pk'
+    max_page_size = None  # type: Optional[int]
+
+    @action()
+    def list(self, page_size: Optional[int] = None,
+             cursor: Optional[str] = None, **kwargs) -> Tuple[Any, int]:
+        queryset = self.filter_queryset(self.get_queryset(**kwargs), **kwargs)
+
+        if page_size is None:
+            serializer = self.get_serializer(
+                instance=queryset, many=True, action_kwargs=kwargs
+            )
+            return serializer.data, status.HTTP_200_OK
+
+        if self.max_page_size is not None and isinstance(page_size, int):
+            page_size = min(page_size, self.max_page_size)
+
+        page, next_cursor = paginate_keyset(
+            queryset, page_size, cursor, ordering=self.page_ordering
+        )
+        serializer = self.get_serializer(
+            instance=page, many=True, action_kwargs=kwargs
+        )
+        return {
+            'results': serializer.data,
+            'cursor': next_cursor
+        }, status.HTTP_200_OK
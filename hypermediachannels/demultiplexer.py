@@ -0,0 +1,31 @@
+from hypermediachannels.compact import COMPACT_SUBPROTOCOL, get_compact_codec
+
+
+class HyperMediaDemultiplexerMixin:
+    """
+    Mixin for an `AsyncJsonWebsocketDemultiplexer` that lets clients
+    negotiate compact references.
+
+    A client requesting the `hypermedia.compact` subprotocol is sent
+    `{'@hypermedia': <dictionary>}` once the connection is accepted and
+    then receives references as positional lists.
+    """
+
+    compact_references = True
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        scope['hypermedia_compact'] = self.compact_references and (
+            COMPACT_SUBPROTOCOL in scope.get('subprotocols', ())
+        )
+        return await super().__call__(scope, receive, send)
+
+    async def accept(self, subprotocol=None, **kwargs):
+        # `headers` is only accepted from channels 4.1, pass it on as given
+        if not self.scope.get('hypermedia_compact'):
+            return await super().accept(subprotocol, **kwargs)
+
+        await super().accept(COMPACT_SUBPROTOCOL, **kwargs)
+        await self.send_json({
+            '@hypermedia': get_compact_codec(type(self)).dictionary
+        })
@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Model, Field, QuerySet
+
+from hypermediachannels.aio import aiterate
+from hypermediachannels.resolution import get_consumer_class
+
+
+def get_consumer(application: Any, scope: Optional[Dict]) -> Any:
+    """
+    Build a consumer instance for a demultiplexer application, to call its
+    `get_object`/`get_queryset` outside of a websocket connection.
+    """
+    consumer_cls = get_consumer_class(application)
+    consumer = consumer_cls(**getattr(application, 'consumer_initkwargs', {}))
+    consumer.scope = scope
+    return consumer
+
+
+def supports_batch_lookup(consumer_cls: type) -> bool:
+    """
+    True if many `get_object` calls on this consumer can be replaced by
+    a single filtered query.
+
+    That requires the default `get_object` and either the default
+    `get_queryset` and `filter_queryset` or the consumer declaring (with
+    `hypermedia_batch_lookups = True`) that they do not depend on the
+    lookup kwargs.
+    """
+    from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+    if not issubclass(consumer_cls, GenericAsyncAPIConsumer):
+        return False
+    if consumer_cls.get_object is not GenericAsyncAPIConsumer.get_object:
+        return False
+    if getattr(consumer_cls, 'hypermedia_batch_lookups', False):
+        return True
+    return (
+        consumer_cls.get_queryset is GenericAsyncAPIConsumer.get_queryset and
+        consumer_cls.filter_queryset is GenericAsyncAPIConsumer.filter_queryset
+    )
+
+
+def get_lookup_field(consumer: Any) -> Optional[Tuple[str, str, Field]]:
+    """
+    The `(kwarg, lookup_field, model_field)` used by a consumer's
+    `get_object` if it can be looked up in bulk (a unique, local field).
+    """
+    queryset = consumer.queryset
+    if queryset is None:
+        return None
+
+    lookup_field = consumer.lookup_field
+    kwarg = consumer.lookup_url_kwarg or lookup_field
+    meta = queryset.model._meta
+
+    if lookup_field == 'pk':
+        return kwarg, lookup_field, meta.pk
+    try:
+        model_field = meta.get_field(lookup_field)
+    except FieldDoesNotExist:
+        return None
+    if not (model_field.concrete and model_field.unique):
+        return None
+    return kwarg, lookup_field, model_field
+
+
+def batch_get_objects(consumer: Any,
+                      payloads: List[Dict]) -> List[Optional[Model]]:
+    """
+    Look up the objects for many `get_object(**payload)` calls with one
+    query.
+
+    Returns a list aligned with `payloads` holding the object found or
+    `None` where the payload could not be batched or nothing was found;
+    callers should fall back to `get_object` for those.
+    """
+    batch = _prepare_batch(consumer, payloads)
+    if batch is None:
+        return [None] * len(payloads)
+    queryset, attname, values = batch
+    return _match_batch(
+        payloads, {getattr(obj, attname): obj for obj in queryset}, values
+    )
+
+
+async def abatch_get_objects(consumer: Any,
+                             payloads: List[Dict]) -> List[Optional[Model]]:
+    """
+    `batch_get_objects` reading the objects without blocking the event
+    loop.
+    """
+    batch = _prepare_batch(consumer, payloads)
+    if batch is None:
+        return [None] * len(payloads)
+    queryset, attname, values = batch
+    found = {}
+    async for obj in aiterate(queryset):
+        found[getattr(obj, attname)] = obj
+    return _match_batch(payloads, found, values)
+
+
+def _prepare_batch(consumer: Any, payloads: List[Dict]) -> Optional[
+        Tuple[QuerySet, str, Dict[int, Any]]]:
+    """
+    The queryset fetching every batchable payload, the attribute the
+    objects are matched on and the lookup value of each payload.
+    """
+    if not supports_batch_lookup(type(consumer)):
+        return None
+    lookup = get_lookup_field(consumer)
+    if lookup is None:
+        return None
+    kwarg, lookup_field, model_field = lookup
+
+    values = {}  # type: Dict[int, Any]
+    for (index, payload) in enumerate(payloads):
+        if kwarg not in payload:
+            continue
+        try:
+            values[index] = model_field.to_python(payload[kwarg])
+        except (DjangoValidationError, TypeError, ValueError):
+            continue
+
+    if not values:
+        return None
+
+    queryset = consumer.filter_queryset(queryset=consumer.get_queryset())
+    return queryset.filter(**{
+        '{}__in'.format(lookup_field): set(values.values())
+    }), model_field.attname, values
+
+
+def _match_batch(payloads: List[Dict], found: Dict[Any, Model],
+                 values: Dict[int, Any]) -> List[Optional[Model]]:
+    results = [None] * len(payloads)  # type: List[Optional[Model]]
+    for (index, value) in values.items():
+        results[index] = found.get(value)
+    return results
@@ -1,18 +1,69 @@
-from typing import Tuple, Optional, Dict, Type, List, Any
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Tuple, Optional, Dict, Type, Any, List, Iterable, Union, Callable
+)
 
-from channels.routing import get_default_application
+from channels.db import database_sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import QuerySet, Model, Manager
 from django.http import Http404
 
-from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
 from rest_framework.exceptions import ValidationError
-from rest_framework.fields import get_attribute
 from rest_framework.generics import get_object_or_404
 from rest_framework.relations import (
     RelatedField, ManyRelatedField,
     MANY_RELATION_KWARGS
 )
 
+from hypermediachannels.aio import ASYNC_QUERYSETS, call_or_defer
+from hypermediachannels.compact import CompactCodec, get_compact_codec
+from hypermediachannels.concurrency import DEFAULT_MAX_WORKERS, gather_results
+from hypermediachannels.dereference import (
+    abatch_get_objects,
+    batch_get_objects,
+    get_consumer
+)
+from hypermediachannels.instrumentation import instrumented
+from hypermediachannels.lookups import (
+    CompiledLookups,
+    LookupAccessor,
+    compile_kwarg_mappings,
+    get_related_model
+)
+from hypermediachannels.references import (
+    Reference,
+    ReferenceTable,
+    ReferenceTemplate,
+    get_reference_template
+)
+from hypermediachannels.resolution import (
+    get_consumer_class,
+    get_resolution_index,
+    get_model_distance
+)
+
+if TYPE_CHECKING:
+    from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+
+def _compose(outer: Callable, inner: Callable) -> Callable:
+    def composed(*args):
+        return outer(inner(*args))
+    return composed
+
+
+def _is_sliced(queryset: QuerySet) -> bool:
+    # `Query.is_sliced` only exists from Django 3.1
+    query = queryset.query
+    return bool(query.low_mark) or query.high_mark is not None
+
+
+def _is_resolved(field: 'HyperChannelsApiMixin', model: Type[Model]) -> bool:
+    if field.stream_name is not None:
+        return True
+    return model in get_resolution_index(field.api_demultiplexer)
+
 
 class HyperChannelsApiMixin:
     kwarg_mappings = {'pk': 'pk'}
@@ -54,8 +105,9 @@ class HyperChannelsApiMixin:
             ))
         return demultiplexer_cls
 
+    @instrumented('resolve', probe=_is_resolved)
     def resolve(self, model: Type[Model]) -> Tuple[
-            Optional[str], Optional[GenericAsyncAPIConsumer]]:
+            Optional[str], Optional['GenericAsyncAPIConsumer']]:
 
         if self.api_demultiplexer is None:
             return None, None
@@ -71,108 +123,378 @@ class HyperChannelsApiMixin:
         return stream_name, consumer
 
     def _get_resolve(self, instance: Type[Model]) -> Tuple[
-            Optional[str], Optional[Type[GenericAsyncAPIConsumer]]]:
+            Optional[str], Optional[Type['GenericAsyncAPIConsumer']]]:
+        return get_resolution_index(self.api_demultiplexer).resolve(instance)
 
-        matches: List[Tuple[int, str, Type[GenericAsyncAPIConsumer]]] = []
+    def _get_model_distance(self, model_cls: Type[Model], other_model_cls: Type[Model]) -> Optional[int]:
+        """
+        Return the distance (in the inheritance tree between to models)
+        """
+        return get_model_distance(model_cls, other_model_cls)
 
-        for (stream, consumer) in self.api_demultiplexer.applications.items():
+    @instrumented('to_representation', 'one')
+    def to_representation(self, instance: Model) -> Optional[Dict]:
+        stream_name, consumer = self.resolve(type(instance))
+        if (stream_name, consumer) == (None, None):
+            return
 
-            if consumer.consumer_class.queryset is None:
-                continue
+        includes = self.get_includes()
+        if includes is None:
+            return self.build_reference(
+                stream_name, self.extract_lookup_values(instance)
+            )
 
-            match = self._get_model_distance(instance, consumer.consumer_class.queryset.model)
+        # included references are always dicts so `data` can be added
+        reference = self.get_reference_template(stream_name).render(
+            self.extract_lookup_values(instance)
+        )
+        self.context['hypermedia_includes'].add(
+            reference, consumer, instance, includes
+        )
+        return reference
 
-            if match is not None:
-                matches.append(
-                    (
-                        match, stream, consumer
-                    )
-                )
+    def get_includes(self) -> Optional[Tuple[str, ...]]:
+        """
+        The include paths within the object this field references if the
+        root serializer includes it, otherwise `None`.
+        """
+        parent = self.parent
+        if parent is None or parent is not self.root or \
+                'hypermedia_includes' not in self.context:
+            return None
+        get_includes = getattr(parent, 'get_includes', None)
+        if get_includes is None:
+            return None
+        return get_includes().get(self.field_name)
 
-        if matches:
-            matches.sort(key=lambda x: x[0])
-            _, stream, consumer = matches[0]
-            return stream, consumer
-        return None, None
+    async def ato_representation(self, instance: Any) -> Any:
+        """
+        `to_representation` for async callers, only using a database thread
+        if a lookup has to load something.
+        """
+        return await call_or_defer(self.to_representation, instance)
 
-    def _get_model_distance(self, model_cls: Type[Model], other_model_cls: Type[Model]) -> Optional[int]:
+    @property
+    def lazy_references(self) -> bool:
         """
-        Return the distance (in the inheritance tree between to models)
+        Whether to return `Reference` objects rather than dicts, set in the
+        context by `HyperMediaConsumerMixin`.
         """
-        if model_cls == other_model_cls:
-            return 0
+        lazy = self.__dict__.get('_lazy_references')
+        if lazy is None:
+            lazy = bool(self.context.get('lazy_references', False))
+            self._lazy_references = lazy
+        return lazy
 
-        if not issubclass(model_cls, other_model_cls):
-            return None
+    @property
+    def compact_references(self) -> bool:
+        """
+        Whether the connection negotiated compact references, set on the
+        scope by `HyperMediaDemultiplexerMixin`.
+        """
+        return bool(self.context.get('scope', {}).get('hypermedia_compact'))
 
-        return model_cls.__bases__.index(other_model_cls)
+    @property
+    def compact_codec(self) -> CompactCodec:
+        return get_compact_codec(self.api_demultiplexer)
 
-    def to_representation(self, instance: Model) -> Optional[Dict]:
-        stream_name, consumer = self.resolve(type(instance))
-        if (stream_name, consumer) == (None, None):
-            return
+    def decode_reference(self, data: List) -> Dict:
+        """
+        Turn a compact reference into its `{stream, payload}` form.
+        """
+        return self.compact_codec.decode(data)
 
-        payload = {
-            'action': self.action_name
-        }
+    @property
+    def reference_keys(self) -> Tuple[str, ...]:
+        """
+        The keys of the reference payload after `action`.
+        """
+        return self.lookups.keys
 
-        payload.update(
-            self.extract_lookups(instance)
+    def get_reference_template(
+            self, stream_name: Optional[str]) -> ReferenceTemplate:
+        return get_reference_template(
+            stream_name, self.action_name, self.reference_keys
         )
 
-        return {
-            'stream': stream_name,
-            'payload': payload
-        }
+    def get_reference_builder(self, stream_name: Optional[str]) -> Callable[
+            [Tuple[Any, ...]], Union[Dict, List, Reference]]:
+        """
+        A callable building references to `stream_name` from lookup values
+        (in the order of the `kwarg_mappings`).
+        """
+        builders = self.__dict__.get('_reference_builders')
+        if builders is None:
+            builders = self._reference_builders = {}
+        builder = builders.get(stream_name)
+        if builder is None:
+            template = self.get_reference_template(stream_name)
+            if self.compact_references:
+                builder = self.compact_codec.get_builder(template)
+            elif self.lazy_references:
+                builder = partial(Reference, template)
+            else:
+                builder = template.render
+            table = self.reference_table
+            if table is not None:
+                builder = _compose(table.add, builder)
+            builders[stream_name] = builder
+        return builder
+
+    @property
+    def reference_table(self) -> Optional[ReferenceTable]:
+        """
+        The table references are collected in when the root serializer
+        deduplicates references.
+        """
+        return getattr(self.root, '_reference_table', None)
+
+    def build_reference(
+            self, stream_name: Optional[str],
+            values: Tuple[Any, ...]) -> Union[Dict, List, Reference]:
+        return self.get_reference_builder(stream_name)(values)
+
+    @property
+    def lookups(self) -> CompiledLookups:
+        """
+        The `kwarg_mappings` compiled into accessors.
+        """
+        lookups = self.__dict__.get('_lookups')
+        if lookups is None:
+            lookups = compile_kwarg_mappings(self.kwarg_mappings)
+            self._lookups = lookups
+        return lookups
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        self._lookups = compile_kwarg_mappings(self.kwarg_mappings)
 
+    @instrumented('extract_lookups')
     def extract_lookups(self, instance) -> Dict[str, Any]:
-        payload = {}
-        for (key, lookup) in self.kwarg_mappings.items():
-            payload[key] = self.extract_lookup(instance, key, lookup)
-        return payload
+        lookups = self.lookups
+        if lookups.needs_parent:
+            return lookups(instance, self.parent.instance)
+        return lookups(instance)
+
+    @instrumented('extract_lookups')
+    def extract_lookup_values(self, instance) -> Tuple[Any, ...]:
+        lookups = self.lookups
+        if lookups.needs_parent:
+            return lookups.values(instance, self.parent.instance)
+        return lookups.values(instance)
 
     def extract_lookup(self, instance, key, lookup) -> Any:
-        lookup_path = lookup.split('.')
-        if lookup_path[0] == 'self':
-            return get_attribute(
-                self.parent.instance,
-                lookup_path[1:]
-            )
-        else:
-            return get_attribute(
-                instance, lookup_path
-            )
+        accessor = LookupAccessor(key, lookup)
+        if accessor.from_parent:
+            return accessor(instance, self.parent.instance)
+        return accessor(instance)
 
 
 class HyperChannelsApiManyRelationField(HyperChannelsApiMixin,
                                         ManyRelatedField):
 
     action_name = 'list'
+    use_relation_metadata = False
+    page_size = None  # type: Optional[int]
+    include_count = False
+
+    _related_model = None  # type: Optional[Type[Model]]
+
+    def __init__(self, *args, **kwargs):
+        use_relation_metadata = kwargs.pop('use_relation_metadata', None)
+        page_size = kwargs.pop('page_size', None)
+        include_count = kwargs.pop('include_count', None)
+
+        super().__init__(*args, **kwargs)
+
+        if use_relation_metadata is not None:
+            self.use_relation_metadata = use_relation_metadata
+        if page_size is not None:
+            self.page_size = page_size
+        if include_count is not None:
+            self.include_count = include_count
+
+    @property
+    def lazy_references(self) -> bool:
+        # references with a count are always sent as dicts
+        return not self.include_count and super().lazy_references
+
+    @property
+    def compact_references(self) -> bool:
+        return not self.include_count and super().compact_references
+
+    @property
+    def reference_table(self) -> Optional[ReferenceTable]:
+        # the count is added to the reference after it is built
+        if self.include_count:
+            return None
+        return super().reference_table
+
+    @property
+    def count_annotation(self) -> str:
+        """
+        The name of the annotation the query plan counts the relation in.
+        """
+        return 'hypermedia_{}_count'.format('_'.join(self.source_attrs))
 
+    @property
+    def reference_keys(self) -> Tuple[str, ...]:
+        if self.page_size is None:
+            return self.lookups.keys
+        return self.lookups.keys + ('page_size',)
+
+    def extract_lookup_values(self, instance) -> Tuple[Any, ...]:
+        values = super().extract_lookup_values(instance)
+        if self.page_size is None:
+            return values
+        return values + (self.page_size,)
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        if self.use_relation_metadata:
+            self._related_model = get_related_model(
+                getattr(getattr(parent, 'Meta', None), 'model', None),
+                self.source_attrs
+            )
+
+    def get_attribute(self, instance):
+        if self._related_model is None:
+            return super().get_attribute(instance)
+        # the reference is built from the parent instance and the related
+        # model alone, so never touch the related manager
+        return instance
+
+    @instrumented('to_representation', 'one')
     def to_representation(self, value: QuerySet) -> Dict:
 
-        stream_name, consumer = self.resolve(value.model)
+        model = self._related_model
+        if model is None:
+            model = value.model
 
-        instance = self.parent.instance
+        stream_name, consumer = self.resolve(model)
 
-        payload = {
-            'action': self.action_name
-        }
+        instance = self.parent.instance
 
-        payload.update(
-            self.extract_lookups(instance)
+        reference = self.build_reference(
+            stream_name, self.extract_lookup_values(instance)
         )
+        if not self.include_count:
+            return reference
+        return dict(reference, count=self.get_count(instance, value))
+
+    def get_count(self, instance: Model, value: Any) -> int:
+        """
+        The size of the relation, read from the query plan's annotation
+        when the instance was loaded with it.
+        """
+        count = getattr(instance, self.count_annotation, None)
+        if count is not None:
+            return count
+        if self._related_model is not None:
+            value = super().get_attribute(value)
+        return value.count()
+
+    @instrumented('to_internal_value', 'items')
+    def to_internal_value(self, data) -> List[Model]:
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        data = list(data)
+        values = [None] * len(data)  # type: List[Optional[Model]]
+
+        pks = {}  # type: Dict[int, Any]
+        references = {}  # type: Dict[int, Tuple[str, Dict, Any]]
+        for (index, item) in enumerate(data):
+            if isinstance(item, int):
+                pks[index] = item
+            elif isinstance(item, dict):
+                references[index] = self.child_relation.parse_reference(item)
+            elif isinstance(item, list):
+                references[index] = self.child_relation.parse_reference(
+                    self.child_relation.decode_reference(item)
+                )
+            else:
+                values[index] = self.child_relation.to_internal_value(item)
+
+        if pks:
+            found = self.child_relation.get_objects_by_pk(pks.values())
+            for (index, pk) in pks.items():
+                values[index] = found[pk]
+
+        if references:
+            found = self.child_relation.get_referenced_objects(
+                list(references.values())
+            )
+            for (index, obj) in zip(references.keys(), found):
+                values[index] = obj
+
+        return values
+
+    async def ato_internal_value(self, data) -> List[Model]:
+        """
+        `to_internal_value` for async callers.
+        """
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        data = list(data)
+        values = [None] * len(data)  # type: List[Optional[Model]]
+
+        pks = {}  # type: Dict[int, Any]
+        references = {}  # type: Dict[int, Tuple[str, Dict, Any]]
+        for (index, item) in enumerate(data):
+            if isinstance(item, int):
+                pks[index] = item
+            elif isinstance(item, dict):
+                references[index] = child.parse_reference(item)
+            elif isinstance(item, list):
+                references[index] = child.parse_reference(
+                    child.decode_reference(item)
+                )
+            else:
+                values[index] = await child.ato_internal_value(item)
+
+        if pks:
+            found = await child.aget_objects_by_pk(pks.values())
+            for (index, pk) in pks.items():
+                values[index] = found[pk]
 
-        return {
-            'stream': stream_name,
-            'payload': payload
-        }
+        if references:
+            found = await child.aget_referenced_objects(
+                list(references.values())
+            )
+            for (index, obj) in zip(references.keys(), found):
+                values[index] = obj
+
+        return values
 
 
 class HyperChannelsApiRelationField(HyperChannelsApiMixin, RelatedField):
 
+    concurrent_lookups = False
+    max_lookup_workers = DEFAULT_MAX_WORKERS
+
+    def __init__(self, *args, **kwargs):
+        concurrent_lookups = kwargs.pop('concurrent_lookups', None)
+        max_lookup_workers = kwargs.pop('max_lookup_workers', None)
+
+        super().__init__(*args, **kwargs)
+
+        if concurrent_lookups is not None:
+            self.concurrent_lookups = concurrent_lookups
+        if max_lookup_workers is not None:
+            self.max_lookup_workers = max_lookup_workers
+
     @classmethod
     def many_init(cls, *args, **kwargs) -> HyperChannelsApiManyRelationField:
+        use_relation_metadata = kwargs.pop('use_relation_metadata', None)
+        page_size = kwargs.pop('page_size', None)
+        include_count = kwargs.pop('include_count', None)
         list_kwargs = {'child_relation': cls(*args, **kwargs)}
 
         for key in kwargs.keys():
@@ -182,8 +504,55 @@ class HyperChannelsApiRelationField(HyperChannelsApiMixin, RelatedField):
                     'stream_name'):
                 list_kwargs[key] = kwargs[key]
 
+        if use_relation_metadata is not None:
+            list_kwargs['use_relation_metadata'] = use_relation_metadata
+        if page_size is not None:
+            list_kwargs['page_size'] = page_size
+        if include_count is not None:
+            list_kwargs['include_count'] = include_count
+
         return HyperChannelsApiManyRelationField(**list_kwargs)
 
+    def get_objects_by_pk(self, pks: Iterable[Any]) -> Dict[Any, Model]:
+        """
+        Look up many pks with a single query, raising one `ValidationError`
+        listing every pk that was not found.
+        """
+        pks = list(dict.fromkeys(pks))
+        queryset = self.get_queryset()
+
+        if _is_sliced(queryset):
+            # `in_bulk` can not be used on sliced querysets
+            return {pk: self.to_internal_value(pk) for pk in pks}
+
+        found = queryset.in_bulk(pks)
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            raise ValidationError("Not found: {}".format(
+                ', '.join(str(pk) for pk in missing)
+            ))
+        return found
+
+    async def aget_objects_by_pk(
+            self, pks: Iterable[Any]) -> Dict[Any, Model]:
+        """
+        `get_objects_by_pk` for async callers.
+        """
+        pks = list(dict.fromkeys(pks))
+        queryset = self.get_queryset()
+
+        if _is_sliced(queryset) or not ASYNC_QUERYSETS:
+            return await database_sync_to_async(self.get_objects_by_pk)(pks)
+
+        found = await queryset.ain_bulk(pks)
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            raise ValidationError("Not found: {}".format(
+                ', '.join(str(pk) for pk in missing)
+            ))
+        return found
+
+    @instrumented('to_internal_value', 'one')
     def to_internal_value(self, data):
         if isinstance(data, int):
             # assume it is a pk
@@ -191,43 +560,162 @@ class HyperChannelsApiRelationField(HyperChannelsApiMixin, RelatedField):
                 return get_object_or_404(self.get_queryset(), pk=data)
             except Http404:
                 raise ValidationError("Not found")
+        if isinstance(data, list):
+            data = self.decode_reference(data)
         if isinstance(data, dict):
-            stream = data.get('stream', None)
-            payload = data.get('payload', None)
-            if not (isinstance(stream, str) and isinstance(payload, dict)):
-                raise ValidationError(
-                    detail='Must be of the format {stream: ...,'
-                           ' payload: {..}}'
-                )
-            action = payload.get('action', None)
+            return self.get_referenced_objects([
+                self.parse_reference(data)
+            ])[0]
+        raise ValidationError(
+            detail="Must be either a hyper-media reference or a pk value"
+        )
 
-            if action is None:
-                raise ValidationError(
-                    detail="must have an action key"
-                )
+    async def ato_internal_value(self, data):
+        """
+        `to_internal_value` for async callers.
+        """
+        if isinstance(data, int):
+            if not ASYNC_QUERYSETS:
+                return await database_sync_to_async(
+                    self.to_internal_value
+                )(data)
+            try:
+                return await self.get_queryset().aget(pk=data)
+            except ObjectDoesNotExist:
+                raise ValidationError("Not found")
+        if isinstance(data, list):
+            data = self.decode_reference(data)
+        if isinstance(data, dict):
+            return (await self.aget_referenced_objects([
+                self.parse_reference(data)
+            ]))[0]
+        raise ValidationError(
+            detail="Must be either a hyper-media reference or a pk value"
+        )
 
-            consumer_cls = self.api_demultiplexer.applications.get(
-                stream
-            )  # type: Type[GenericAsyncAPIConsumer]
+    def parse_reference(self, data: Dict) -> Tuple[str, Dict, Any]:
+        """
+        Validate a `{stream: ..., payload: {action: ...}}` reference,
+        returning the stream, payload and demultiplexer application.
+        """
+        stream = data.get('stream', None)
+        payload = data.get('payload', None)
+        if not (isinstance(stream, str) and isinstance(payload, dict)):
+            raise ValidationError(
+                detail='Must be of the format {stream: ...,'
+                       ' payload: {..}}'
+            )
+        action = payload.get('action', None)
 
-            if consumer_cls is None:
-                raise ValidationError(
-                    detail=f"stream {stream} not found."
-                )
+        if action is None:
+            raise ValidationError(
+                detail="must have an action key"
+            )
 
-            if action not in consumer_cls.available_actions:
-                raise ValidationError(
-                    detail=f"action {action} not supported on {stream}."
-                )
+        application = self.api_demultiplexer.applications.get(
+            stream
+        )
 
-            consumer = consumer_cls(self.context.get('scope'))
+        if application is None:
+            raise ValidationError(
+                detail=f"stream {stream} not found."
+            )
 
-            try:
-                return consumer.get_object(**payload)
-            except Http404:
-                raise ValidationError("Not found")
-            except AssertionError:
-                raise ValidationError("Incorrect lookup arguments")
-        raise ValidationError(
-            detail="Must be either a hyper-media reference or a pk value"
+        consumer_cls = get_consumer_class(
+            application
+        )  # type: Type[GenericAsyncAPIConsumer]
+
+        if action not in consumer_cls.available_actions:
+            raise ValidationError(
+                detail=f"action {action} not supported on {stream}."
+            )
+
+        return stream, payload, application
+
+    def get_referenced_objects(
+            self, references: List[Tuple[str, Dict, Any]]) -> List[Model]:
+        """
+        Dereference parsed references, grouping them by stream so that
+        each group costs one consumer and (where the consumer allows it)
+        one query.
+        """
+        values = [None] * len(references)  # type: List[Optional[Model]]
+
+        groups = {}  # type: Dict[str, List[int]]
+        for (index, (stream, _, _)) in enumerate(references):
+            groups.setdefault(stream, []).append(index)
+
+        lookups = [
+            partial(self._get_referenced_group, [
+                references[index] for index in indexes
+            ])
+            for indexes in groups.values()
+        ]
+        if self.concurrent_lookups:
+            found = gather_results(lookups, self.max_lookup_workers)
+        else:
+            found = [lookup() for lookup in lookups]
+
+        for (indexes, objects) in zip(groups.values(), found):
+            for (index, obj) in zip(indexes, objects):
+                values[index] = obj
+
+        return values
+
+    def _get_referenced_group(
+            self, references: List[Tuple[str, Dict, Any]]) -> List[Model]:
+        # references to a single stream
+        consumer = get_consumer(references[0][2], self.context.get('scope'))
+        payloads = [payload for (_, payload, _) in references]
+        if len(payloads) > 1:
+            found = batch_get_objects(consumer, payloads)
+        else:
+            found = [None]
+
+        return [
+            self.get_referenced_object(consumer, payload)
+            if obj is None else obj
+            for (payload, obj) in zip(payloads, found)
+        ]
+
+    async def aget_referenced_objects(
+            self, references: List[Tuple[str, Dict, Any]]) -> List[Model]:
+        """
+        `get_referenced_objects` for async callers. Batched lookups are read
+        on the event loop, consumers' own `get_object` runs in a database
+        thread.
+        """
+        values = [None] * len(references)  # type: List[Optional[Model]]
+
+        groups = {}  # type: Dict[str, List[int]]
+        for (index, (stream, _, _)) in enumerate(references):
+            groups.setdefault(stream, []).append(index)
+
+        get_referenced_object = database_sync_to_async(
+            self.get_referenced_object
         )
+        for (stream, indexes) in groups.items():
+            consumer = get_consumer(
+                references[indexes[0]][2], self.context.get('scope')
+            )
+            payloads = [references[index][1] for index in indexes]
+            if len(payloads) > 1:
+                found = await abatch_get_objects(consumer, payloads)
+            else:
+                found = [None]
+
+            for (index, payload, obj) in zip(indexes, payloads, found):
+                if obj is None:
+                    obj = await get_referenced_object(consumer, payload)
+                values[index] = obj
+
+        return values
+
+    def get_referenced_object(self, consumer: 'GenericAsyncAPIConsumer',
+                              payload: Dict) -> Model:
+        try:
+            return consumer.get_object(**payload)
+        except Http404:
+            raise ValidationError("Not found")
+        except AssertionError:
+            raise ValidationError("Incorrect lookup arguments")
@@ -0,0 +1,76 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Model
+
+from hypermediachannels.dereference import get_consumer
+
+
+def parse_include_paths(paths: Iterable[str]) -> Dict[str, Tuple[str, ...]]:
+    """
+    Split dotted include paths into the field names to include and the
+    paths to include within each of them.
+
+    `('team', 'team.owner', 'user')` becomes
+    `{'team': ('owner',), 'user': ()}`.
+    """
+    includes = {}  # type: Dict[str, List[str]]
+    for path in paths:
+        name, _, rest = path.partition('.')
+        nested = includes.setdefault(name, [])
+        if rest:
+            nested.append(rest)
+    return {name: tuple(nested) for (name, nested) in includes.items()}
+
+
+class IncludeCollector:
+    """
+    Collects the references of a response to expand with the serialized
+    object they point to.
+
+    Expansion is deferred until the whole response is built so that every
+    object of a model is loaded with a single query, level by level for
+    nested includes.
+    """
+
+    def __init__(self):
+        # (reference, application, instance, nested include paths)
+        self.pending = []  # type: List[Tuple[Dict, Any, Model, Tuple]]
+
+    def add(self, reference: Dict, application: Any, instance: Model,
+            includes: Tuple[str, ...]):
+        self.pending.append((reference, application, instance, includes))
+
+    def resolve(self, context: Dict):
+        while self.pending:
+            pending, self.pending = self.pending, []
+
+            groups = {}  # type: Dict[Tuple[Any, type], List[Tuple]]
+            for item in pending:
+                groups.setdefault(
+                    (item[1], type(item[2])), []
+                ).append(item)
+
+            for ((application, _), items) in groups.items():
+                self._expand(application, items, context)
+
+    def _expand(self, application: Any, items: List[Tuple], context: Dict):
+        consumer = get_consumer(application, context.get('scope'))
+        serializer_cls = getattr(consumer, 'serializer_class', None)
+        if serializer_cls is None:
+            return
+
+        queryset = consumer.filter_queryset(queryset=consumer.get_queryset())
+        optimize_queryset = getattr(serializer_cls, 'optimize_queryset', None)
+        if optimize_queryset is not None:
+            queryset = optimize_queryset(queryset)
+        found = queryset.in_bulk({instance.pk for (_, _, instance, _) in items})
+
+        for (reference, _, instance, includes) in items:
+            obj = found.get(instance.pk)  # type: Optional[Model]
+            if obj is None:
+                # not visible through the consumer's queryset
+                continue
+            serializer = serializer_cls(
+                instance=obj, context=dict(context, include=includes)
+            )
+            reference['data'] = serializer.to_representation(obj)
@@ -0,0 +1,193 @@
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from django.db import connections
+
+
+class FieldEvent:
+    """
+    One instrumented call of a hypermedia field method.
+
+    `duration` is in seconds and `queries` counts the queries issued during
+    the call, both include nested instrumented calls (eg. the `resolve` of
+    a `to_representation`). `references` is the number of references built
+    or dereferenced and `cache_hit` whether a `resolve` was served from the
+    resolution index (`None` for other operations).
+    """
+
+    __slots__ = ('field', 'operation', 'duration', 'queries', 'references',
+                 'cache_hit')
+
+    def __init__(self, field: Any, operation: str, duration: float,
+                 queries: int, references: int,
+                 cache_hit: Optional[bool] = None):
+        self.field = field
+        self.operation = operation
+        self.duration = duration
+        self.queries = queries
+        self.references = references
+        self.cache_hit = cache_hit
+
+    @property
+    def serializer_name(self) -> str:
+        field = self.field
+        parent = getattr(field, 'parent', None)
+        # the child of a many relation reports as the many relation
+        if parent is not None and \
+                getattr(parent, 'child_relation', None) is field:
+            field, parent = parent, parent.parent
+        # a root (list) serializer reports as itself
+        return type(field if parent is None else parent).__name__
+
+    @property
+    def field_name(self) -> Optional[str]:
+        return getattr(self.field, 'field_name', None)
+
+    def __repr__(self):
+        return '<{} {}.{} {} {:.6f}s {} queries>'.format(
+            self.__class__.__name__, self.serializer_name, self.field_name,
+            self.operation, self.duration, self.queries
+        )
+
+
+Hook = Callable[[FieldEvent], None]
+
+# replaced rather than mutated so instrumented calls can read it unlocked
+_hooks = ()  # type: Tuple[Hook, ...]
+_lock = Lock()
+
+
+def add_hook(hook: Hook):
+    """
+    Call `hook` with a `FieldEvent` after every instrumented field call.
+    """
+    global _hooks
+    with _lock:
+        _hooks = _hooks + (hook,)
+
+
+def remove_hook(hook: Hook):
+    global _hooks
+    with _lock:
+        hooks = list(_hooks)
+        hooks.remove(hook)
+        _hooks = tuple(hooks)
+
+
+def is_enabled() -> bool:
+    return bool(_hooks)
+
+
+@contextmanager
+def instrument(hook: Hook):
+    """
+    Add `hook` for the duration of the block.
+    """
+    add_hook(hook)
+    try:
+        yield hook
+    finally:
+        remove_hook(hook)
+
+
+class _QueryCounter:
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _count_one(result: Any) -> int:
+    return 0 if result is None else 1
+
+
+def _count_none(result: Any) -> int:
+    return 0
+
+
+def _count_items(result: Any) -> int:
+    return 0 if result is None else len(result)
+
+
+COUNTERS = {
+    'one': _count_one,
+    'none': _count_none,
+    'items': _count_items,
+}
+
+
+def instrumented(operation: str, references: str = 'none',
+                 probe: Optional[Callable[..., Optional[bool]]] = None
+                 ) -> Callable[[Callable], Callable]:
+    """
+    Report the calls of a field method to the hooks as `operation`.
+
+    Without hooks the method is called straight away. `references` (a key
+    of `COUNTERS`) counts the references in the result and `probe`, called
+    with the method's arguments beforehand, tells whether it hit a cache.
+    """
+    count = COUNTERS[references]
+
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(field, *args):
+            if not _hooks:
+                return method(field, *args)
+
+            cache_hit = None if probe is None else probe(field, *args)
+            counter = _QueryCounter()
+            result = None
+            start = time.perf_counter()
+            try:
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(
+                            connection.execute_wrapper(counter)
+                        )
+                    result = method(field, *args)
+                return result
+            finally:
+                event = FieldEvent(
+                    field, operation, time.perf_counter() - start,
+                    counter.count, count(result), cache_hit
+                )
+                for hook in _hooks:
+                    hook(event)
+        return wrapper
+    return decorator
+
+
+class FieldStats:
+    """
+    A hook totalling the events per serializer, field and operation, eg. to
+    be flushed to a metrics pipeline once a message is sent.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(
+            lambda: {
+                'calls': 0, 'duration': 0.0, 'queries': 0, 'references': 0,
+                'cache_hits': 0
+            }
+        )  # type: Dict[Tuple[Optional[str], Optional[str], str], Dict]
+
+    def __call__(self, event: FieldEvent):
+        totals = self.totals[
+            (event.serializer_name, event.field_name, event.operation)
+        ]
+        totals['calls'] += 1
+        totals['duration'] += event.duration
+        totals['queries'] += event.queries
+        totals['references'] += event.references
+        totals['cache_hits'] += bool(event.cache_hit)
+
+    def clear(self):
+        self.totals.clear()
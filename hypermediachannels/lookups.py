@@ -0,0 +1,177 @@
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Any, Tuple, Optional, Sequence, Type
+
+from django.core.exceptions import ObjectDoesNotExist, FieldDoesNotExist
+from django.db.models import Model
+from rest_framework.fields import is_simple_callable
+
+
+@lru_cache(maxsize=None)
+def get_foreign_key_attname(model_cls: type, name: str,
+                            target: str) -> Optional[str]:
+    """
+    If `<name>.<target>` on `model_cls` reads the field a foreign key points
+    at (eg. `team.pk`), return the attname of the local column holding that
+    value (eg. `team_id`).
+    """
+    if not (isinstance(model_cls, type) and issubclass(model_cls, Model)):
+        return None
+    try:
+        field = model_cls._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+    if not (field.concrete and (field.many_to_one or field.one_to_one)):
+        return None
+
+    target_field = field.target_field
+    if target == 'pk':
+        if target_field != field.related_model._meta.pk:
+            return None
+    elif target not in (target_field.name, target_field.attname):
+        return None
+    return field.attname
+
+
+def get_related_model(model_cls: Optional[Type[Model]],
+                      attrs: Sequence[str]) -> Optional[Type[Model]]:
+    """
+    Follow the relations named by `attrs` through `_meta`, returning the
+    model at the end of the path or `None` if it is not a relation path.
+    """
+    if not attrs:
+        return None
+    for attr in attrs:
+        if model_cls is None:
+            return None
+        try:
+            field = model_cls._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        model_cls = field.related_model
+    return model_cls
+
+
+class LookupAccessor:
+    """
+    A precompiled `kwarg_mappings` entry.
+
+    `'team_pk': 'self.team.pk'` becomes an accessor that reads `team.pk`
+    from the parent serializer's instance, `'username': 'username'` one
+    that reads `username` from the field's own instance. Values are read
+    the same way as DRF's `get_attribute` (attribute access, falling back
+    to keys for mappings and calling simple callables).
+
+    Paths ending in `<foreign key>.pk` (or the foreign key's `to_field`)
+    read the local `<foreign key>_id` column so the related row is not
+    loaded.
+    """
+
+    __slots__ = ('key', 'lookup', 'from_parent', 'attrs', 'head', 'tail')
+
+    def __init__(self, key: str, lookup: str):
+        self.key = key
+        self.lookup = lookup
+
+        lookup_path = lookup.split('.')
+        self.from_parent = lookup_path[0] == 'self'
+        if self.from_parent:
+            lookup_path = lookup_path[1:]
+        self.attrs = tuple(lookup_path)
+        # split off a possible `<foreign key>.<target>` suffix
+        self.head = self.attrs[:-2]
+        self.tail = self.attrs[-2:] if len(self.attrs) >= 2 else None
+
+    def __call__(self, instance: Any, parent_instance: Any = None) -> Any:
+        if self.from_parent:
+            instance = parent_instance
+
+        tail = self.tail
+        if tail is None:
+            return self.traverse(instance, self.attrs)
+
+        instance = self.traverse(instance, self.head)
+        attname = get_foreign_key_attname(type(instance), *tail)
+        if attname is not None:
+            return getattr(instance, attname)
+        return self.traverse(instance, tail)
+
+    @staticmethod
+    def traverse(instance: Any, attrs: Tuple[str, ...]) -> Any:
+        for attr in attrs:
+            try:
+                if isinstance(instance, Mapping):
+                    instance = instance[attr]
+                else:
+                    instance = getattr(instance, attr)
+            except ObjectDoesNotExist:
+                return None
+            if callable(instance) and is_simple_callable(instance):
+                try:
+                    instance = instance()
+                except (AttributeError, KeyError) as exc:
+                    raise ValueError(
+                        'Exception raised in callable attribute "{}"; '
+                        'original exception was: {}'.format(attr, exc)
+                    )
+        return instance
+
+    def __repr__(self):
+        return '<{} {}={!r}>'.format(
+            self.__class__.__name__, self.key, self.lookup
+        )
+
+
+class CompiledLookups:
+    """
+    The compiled form of a whole `kwarg_mappings` dict.
+    """
+
+    __slots__ = ('accessors', 'keys', 'needs_parent')
+
+    def __init__(self, accessors: Tuple[LookupAccessor, ...]):
+        self.accessors = accessors
+        self.keys = tuple(accessor.key for accessor in accessors)
+        self.needs_parent = any(
+            accessor.from_parent for accessor in accessors
+        )
+
+    def __call__(self, instance: Any,
+                 parent_instance: Any = None) -> Dict[str, Any]:
+        return {
+            accessor.key: accessor(instance, parent_instance)
+            for accessor in self.accessors
+        }
+
+    def values(self, instance: Any,
+               parent_instance: Any = None) -> Tuple[Any, ...]:
+        """
+        The lookup values alone, in the order of `keys`.
+        """
+        return tuple([
+            accessor(instance, parent_instance)
+            for accessor in self.accessors
+        ])
+
+    def __iter__(self):
+        return iter(self.accessors)
+
+    def __len__(self):
+        return len(self.accessors)
+
+
+@lru_cache(maxsize=None)
+def _compile(items: Tuple[Tuple[str, str], ...]) -> CompiledLookups:
+    return CompiledLookups(tuple(
+        LookupAccessor(key, lookup) for (key, lookup) in items
+    ))
+
+
+def compile_kwarg_mappings(
+        kwarg_mappings: Optional[Dict[str, str]]) -> CompiledLookups:
+    """
+    Compile a `kwarg_mappings` dict, sharing the result between all fields
+    that use the same mappings.
+    """
+    return _compile(tuple((kwarg_mappings or {}).items()))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hypermediachannels.registry import build_registry, find_demultiplexers
+
+
+class Command(BaseCommand):
+    help = 'Validate the hypermedia serializers of every demultiplexer.'
+
+    def handle(self, *args, **options):
+        demultiplexers = find_demultiplexers()
+        errors = build_registry(demultiplexers, fail=False)
+        for error in errors:
+            self.stderr.write(error)
+        if errors:
+            raise CommandError(
+                'Found {} hypermedia configuration problems.'.format(
+                    len(errors)
+                )
+            )
+        self.stdout.write('Checked {} demultiplexers.'.format(
+            len(demultiplexers)
+        ))
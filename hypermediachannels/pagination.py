@@ -0,0 +1,189 @@
+import base64
+import binascii
+import datetime
+import json
+from typing import Any, List, Optional, Tuple
+
+from django.core import exceptions
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Field, Model, Q, QuerySet
+from rest_framework.exceptions import ValidationError
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """
+    Keeps the microseconds `DjangoJSONEncoder` drops from datetimes and
+    times, rows closer than a millisecond would otherwise share a key.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    An opaque cursor holding the ordering values of the last row of a page.
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps(values, cls=_CursorEncoder).encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (AttributeError, binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError(detail='Invalid cursor.')
+    if not isinstance(values, list):
+        raise ValidationError(detail='Invalid cursor.')
+    return values
+
+
+def get_keyset_ordering(queryset: QuerySet,
+                        ordering: str = 'pk') -> Tuple[str, ...]:
+    """
+    The fields a keyset is ordered on, `ordering` followed by the primary
+    key (unless `ordering` already is the primary key) to break ties.
+    """
+    pk_name = queryset.model._meta.pk.name
+    field = ordering.lstrip('-')
+    if field in ('pk', pk_name):
+        return ordering,
+    return ordering, '-pk' if ordering.startswith('-') else 'pk'
+
+
+def paginate_keyset(queryset: QuerySet, page_size: int,
+                    cursor: Optional[str] = None,
+                    ordering: str = 'pk') -> Tuple[List[Model], Optional[str]]:
+    """
+    Return a page of `queryset` and the cursor of the next page (`None` on
+    the last page).
+
+    Rather than an `OFFSET` the page is selected with
+    `WHERE key > <last key of the previous page>` so that deep pages are as
+    cheap as the first one when `ordering` is indexed. Foreign keys are
+    compared by their primary key and NULL sorts before any other value.
+    """
+    if not isinstance(page_size, int) or page_size < 1:
+        raise ValidationError(detail='page_size must be a positive integer.')
+
+    keys = get_keyset_ordering(queryset, ordering)
+    fields = [_get_key_fields(queryset.model, key.lstrip('-')) for key in keys]
+    nullable = [_is_nullable(path) for path in fields]
+    queryset = queryset.order_by(*(
+        _order_by(key, null) for (key, null) in zip(keys, nullable)
+    ))
+
+    if cursor is not None:
+        values = decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise ValidationError(detail='Invalid cursor.')
+        values = [
+            _to_python(path[-1], value)
+            for (path, value) in zip(fields, values)
+        ]
+        queryset = queryset.filter(_keyset_after(keys, values, nullable))
+
+    page = list(queryset[:page_size + 1])
+    if len(page) <= page_size:
+        return page, None
+
+    page = page[:page_size]
+    last = page[-1]
+    return page, encode_cursor([
+        _get_key_value(last, key.lstrip('-'), path[-1])
+        for (key, path) in zip(keys, fields)
+    ])
+
+
+def _get_key_fields(model: type, key: str) -> List[Field]:
+    """
+    The fields `key` goes through, following `__` across relations.
+    """
+    path = []  # type: List[Field]
+    for attr in key.split('__'):
+        if path:
+            model = path[-1].related_model
+            if model is None:
+                raise exceptions.FieldDoesNotExist(key)
+        path.append(
+            model._meta.pk if attr == 'pk' else model._meta.get_field(attr)
+        )
+    return path
+
+
+def _is_nullable(path: List[Field]) -> bool:
+    # reverse and many to many relations are outer joins
+    return any(
+        field.null or field.one_to_many or field.many_to_many
+        for field in path
+    )
+
+
+def _order_by(key: str, nullable: bool) -> Any:
+    """
+    Nullable keys sort NULL as the smallest value on every database, so
+    that `_keyset_after` knows where they are.
+    """
+    if not nullable:
+        return key
+    if key.startswith('-'):
+        return F(key[1:]).desc(nulls_last=True)
+    return F(key).asc(nulls_first=True)
+
+
+def _get_key_value(instance: Model, key: str, field: Field) -> Any:
+    attrs = key.split('__')
+    value = instance
+    for attr in attrs[:-1]:
+        value = getattr(value, attr)
+        if value is None:
+            return None
+    # the primary key of a foreign key rather than the related object
+    return getattr(value, getattr(field, 'attname', attrs[-1]))
+
+
+def _to_python(field: Field, value: Any) -> Any:
+    """
+    `value` read back from a cursor as `field` would return it, e.g. a
+    datetime from its ISO string.
+    """
+    # reverse relations have no `to_python`, their value is a pk
+    if not hasattr(field, 'to_python'):
+        field = field.related_model._meta.pk
+    try:
+        return field.to_python(value)
+    except exceptions.ValidationError:
+        raise ValidationError(detail='Invalid cursor.')
+
+
+def _keyset_after(keys: Tuple[str, ...], values: List[Any],
+                  nullable: List[bool]) -> Q:
+    """
+    `(a, b) > (x, y)` written as `a > x OR (a = x AND b > y)`, with `<` for
+    descending keys.
+
+    NULL sorts as the smallest value of nullable keys, nothing comes
+    before it in descending order and every value comes after it in
+    ascending order.
+    """
+    condition = Q()
+    equal = Q()
+    for (key, value, null) in zip(keys, values, nullable):
+        name = key.lstrip('-')
+        descending = key.startswith('-')
+        if value is None:
+            if not descending:
+                condition |= equal & Q(**{name + '__isnull': False})
+            equal &= Q(**{name + '__isnull': True})
+            continue
+
+        lookup = '{}__lt' if descending else '{}__gt'
+        after = Q(**{lookup.format(name): value})
+        if null and descending:
+            after |= Q(**{name + '__isnull': True})
+        condition |= equal & after
+        equal &= Q(**{name: value})
+    return condition
@@ -0,0 +1,267 @@
+from typing import Dict, Iterable, Optional, Sequence, Set, Type, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Model, QuerySet
+from rest_framework.fields import Field
+from rest_framework.relations import ManyRelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from hypermediachannels.lookups import (
+    CompiledLookups,
+    get_foreign_key_attname
+)
+
+
+class QueryPlan:
+    """
+    The relations and columns a serializer reads from its instances.
+
+    `only` is `None` when the plan cannot tell which columns are read (eg.
+    a field reads a python property) in which case all columns are loaded.
+    `counts` maps annotation names to the many relations they count.
+    """
+
+    def __init__(self, model: Type[Model],
+                 select_related: Iterable[str] = (),
+                 prefetch_related: Iterable[str] = (),
+                 only: Optional[Iterable[str]] = None,
+                 counts: Optional[Dict[str, str]] = None):
+        self.model = model
+        self.select_related = tuple(sorted(select_related))
+        self.prefetch_related = tuple(sorted(prefetch_related))
+        self.only = tuple(sorted(only)) if only is not None else None
+        self.counts = tuple(sorted((counts or {}).items()))
+
+    def apply(self, queryset: QuerySet) -> QuerySet:
+        """
+        Apply the plan to an unevaluated queryset of the plan's model.
+
+        Anything else (lists, evaluated, `values()` or combined querysets,
+        querysets for another model) is returned unchanged. `only()` is
+        skipped if the queryset already defers fields or selects other
+        relations.
+        """
+        if not isinstance(queryset, QuerySet) or \
+                queryset.model is not self.model or \
+                queryset._result_cache is not None or \
+                queryset._fields is not None or \
+                queryset.query.combinator:
+            return queryset
+
+        query = queryset.query
+        can_restrict = query.deferred_loading == (frozenset(), True) and \
+            query.select_related is False
+
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only is not None and can_restrict:
+            queryset = queryset.only(*self.only)
+
+        annotations = {
+            name: Count(path, distinct=True)
+            for (name, path) in self.counts
+            if name not in query.annotations
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+    def __eq__(self, other):
+        if not isinstance(other, QueryPlan):
+            return NotImplemented
+        return (
+            self.model, self.select_related, self.prefetch_related, self.only,
+            self.counts
+        ) == (
+            other.model, other.select_related, other.prefetch_related,
+            other.only, other.counts
+        )
+
+    def __repr__(self):
+        return '<{} {} select_related={} prefetch_related={} only={} ' \
+               'counts={}>'.format(
+                   self.__class__.__name__, self.model.__name__,
+                   self.select_related, self.prefetch_related, self.only,
+                   dict(self.counts)
+               )
+
+
+class QueryPlanBuilder:
+    """
+    Collects the attribute paths read from instances of `model` and turns
+    them into a `QueryPlan`.
+    """
+
+    def __init__(self, model: Type[Model]):
+        self.model = model
+        self.select_related = set()  # type: Set[str]
+        self.prefetch_related = set()  # type: Set[str]
+        self.only = {model._meta.pk.name}  # type: Set[str]
+        self.counts = {}  # type: Dict[str, str]
+        self.complete = True
+
+    def build(self) -> QueryPlan:
+        return QueryPlan(
+            self.model,
+            select_related=self.select_related,
+            prefetch_related=self.prefetch_related,
+            only=self.only if self.complete else None,
+            counts=self.counts
+        )
+
+    def add_path(self, attrs: Sequence[str]):
+        """
+        Record that `attrs` is read from the root instance. If the path ends
+        on a relation the related object is loaded with all its columns.
+        """
+        model = self.model
+        prefix = []  # type: list
+
+        for index, attr in enumerate(attrs):
+            if attr == 'pk':
+                attr = model._meta.pk.name
+            try:
+                field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # a property or method, we can not tell what it reads
+                self.complete = False
+                return
+
+            path = prefix + [attr]
+
+            if not field.is_relation:
+                self.only.add('__'.join(path))
+                return
+
+            rest = attrs[index + 1:]
+            if len(rest) == 1 and get_foreign_key_attname(
+                    model, attr, rest[0]) is not None:
+                self.only.add('__'.join(path))
+                return
+
+            if field.many_to_many or field.one_to_many:
+                self.prefetch_related.add('__'.join(path))
+                return
+
+            if field.concrete:
+                self.only.add('__'.join(path))
+            self.select_related.add('__'.join(path))
+            prefix = path
+            model = field.related_model
+
+        if prefix:
+            for field in model._meta.concrete_fields:
+                self.only.add('__'.join(prefix + [field.name]))
+
+    def add_lookups(self, lookups: CompiledLookups,
+                    source_attrs: Sequence[str] = (),
+                    parent_attrs: Sequence[str] = ()):
+        """
+        Record the paths read by compiled `kwarg_mappings`, relative to the
+        object at `source_attrs` (or `parent_attrs` for `self.` lookups).
+        """
+        for accessor in lookups:
+            base = parent_attrs if accessor.from_parent else source_attrs
+            self.add_path(tuple(base) + accessor.attrs)
+
+    def add_field(self, field: Field):
+        # avoid a circular import
+        from hypermediachannels.fields import HyperChannelsApiMixin
+
+        source_attrs = tuple(field.source_attrs)
+
+        if isinstance(field, ManyRelatedField):
+            if not isinstance(field, HyperChannelsApiMixin):
+                # other many fields evaluate the related manager
+                self.add_path(source_attrs)
+                return
+            # the related manager is never evaluated, only the path to it
+            # and the lookups (always read from the parent instance)
+            self.add_path(source_attrs[:-1])
+            self.add_lookups(field.lookups)
+            if getattr(field, 'include_count', False):
+                self.counts[field.count_annotation] = '__'.join(
+                    source_attrs
+                )
+            return
+
+        if isinstance(field, HyperChannelsApiMixin):
+            if source_attrs:
+                self.add_path(source_attrs)
+            self.add_lookups(field.lookups, source_attrs)
+            return
+
+        if not source_attrs:
+            # `source='*'` passes the whole instance to the field
+            self.complete = False
+            return
+
+        if isinstance(field, ListSerializer):
+            self.prefetch_related.add('__'.join(source_attrs))
+            return
+
+        self.add_path(source_attrs)
+
+
+def build_query_plan(serializer: BaseSerializer) -> QueryPlan:
+    """
+    Plan the queryset needed to serialize instances with `serializer`.
+    """
+    builder = QueryPlanBuilder(serializer.Meta.model)
+    for field in serializer._readable_fields:
+        builder.add_field(field)
+    return builder.build()
+
+
+def build_reference_query_plan(model: Type[Model],
+                               lookups: CompiledLookups) -> QueryPlan:
+    """
+    Plan the queryset needed to build references to instances of `model`.
+    """
+    builder = QueryPlanBuilder(model)
+    if lookups.needs_parent:
+        builder.complete = False
+    builder.add_lookups(
+        CompiledLookups(tuple(
+            accessor for accessor in lookups if not accessor.from_parent
+        ))
+    )
+    return builder.build()
+
+
+def get_lookup_columns(model: Type[Model],
+                       lookups: CompiledLookups) -> Optional[Tuple[str, ...]]:
+    """
+    If every lookup reads a local column of `model` return those columns
+    (in the order of the lookups) so they can be fetched with
+    `values_list`, otherwise `None`.
+    """
+    columns = []
+    for accessor in lookups:
+        if accessor.from_parent:
+            return None
+        attrs = accessor.attrs
+        if len(attrs) == 2:
+            column = get_foreign_key_attname(model, *attrs)
+        elif len(attrs) == 1:
+            column = _get_local_column(model, attrs[0])
+        else:
+            column = None
+        if column is None:
+            return None
+        columns.append(column)
+    return tuple(columns)
+
+
+def _get_local_column(model: Type[Model], attr: str) -> Optional[str]:
+    if attr == 'pk':
+        return attr
+    try:
+        field = model._meta.get_field(attr)
+    except FieldDoesNotExist:
+        return None
+    if not field.concrete or field.is_relation:
+        return None
+    return field.attname
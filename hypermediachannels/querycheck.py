@@ -0,0 +1,159 @@
+import sys
+import warnings
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from threading import Lock
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import Field
+
+from hypermediachannels.lookups import LookupAccessor
+
+# the context key of the tracker of the root serializer being serialized
+QUERY_TRACKER = 'hypermedia_query_tracker'
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_checks_enabled() -> bool:
+    """
+    Whether root serializers track their queries, turned on with the
+    `HYPERMEDIA_QUERY_CHECKS` setting (in development and tests).
+    """
+    return bool(getattr(settings, 'HYPERMEDIA_QUERY_CHECKS', False))
+
+
+# the number of trackers recording queries, items are only tracked while
+# there are any
+_active = 0
+_lock = Lock()
+
+
+def is_tracking() -> bool:
+    return _active > 0
+
+
+def _find_culprit() -> Tuple[Optional[Field], Optional[str]]:
+    """
+    The field on the stack issuing a query and the lookup path (a
+    `kwarg_mappings` lookup or else the field's `source`) it was following.
+    """
+    path = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if path is None and isinstance(owner, LookupAccessor):
+            path = owner.lookup
+        elif isinstance(owner, Field):
+            return owner, path if path is not None else owner.source
+        frame = frame.f_back
+    return None, path
+
+
+def _get_label(serializer: Field) -> str:
+    child = getattr(serializer, 'child', None)
+    if child is not None:
+        return '{}(many=True)'.format(type(child).__name__)
+    return type(serializer).__name__
+
+
+class NPlusOneQuery:
+    """
+    A query issued once per item by the same field and lookup path.
+    """
+
+    __slots__ = ('serializer', 'field', 'path', 'sql', 'count')
+
+    def __init__(self, serializer: str, field: Optional[str],
+                 path: Optional[str], sql: str, count: int):
+        self.serializer = serializer
+        self.field = field
+        self.path = path
+        self.sql = sql
+        self.count = count
+
+    def __str__(self):
+        location = self.serializer
+        if self.field:
+            location = '{}.{}'.format(location, self.field)
+        return 'N+1 queries in {} following {!r}, run for {} items: ' \
+               '{}'.format(location, self.path, self.count, self.sql)
+
+
+class QueryTracker:
+    """
+    Records the queries of a root serializer and which item of which
+    (list) serializer each of them was issued for.
+    """
+
+    def __init__(self):
+        self.queries = []  # type: List[str]
+        self._items = []  # type: List[Tuple[str, int]]
+        self._counts = defaultdict(int)  # type: Dict[str, int]
+        self._seen = defaultdict(set)  # type: Dict[Tuple, Set[int]]
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        if self._items:
+            label, index = self._items[-1]
+            field, path = _find_culprit()
+            name = None
+            if field is not None and field.field_name:
+                name = field.field_name
+            self._seen[label, name, path, sql].add(index)
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def track(self):
+        global _active
+        with _lock:
+            _active += 1
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self))
+                yield self
+        finally:
+            with _lock:
+                _active -= 1
+
+    @contextmanager
+    def item(self, serializer: Field):
+        label = _get_label(serializer)
+        self._items.append((label, self._counts[label]))
+        self._counts[label] += 1
+        try:
+            yield
+        finally:
+            self._items.pop()
+
+    def find_n_plus_one(self) -> List[NPlusOneQuery]:
+        return [
+            NPlusOneQuery(label, name, path, sql, len(items))
+            for ((label, name, path, sql), items) in self._seen.items()
+            if len(items) > 1
+        ]
+
+    def check(self, meta: Any):
+        """
+        Warn about N+1 queries and fail if there were more queries than the
+        `query_budget` of the serializer `meta`.
+        """
+        for query in self.find_n_plus_one():
+            warnings.warn(str(query), NPlusOneWarning, stacklevel=3)
+
+        budget = getattr(meta, 'query_budget', None)
+        if budget is not None and len(self.queries) > budget:
+            raise QueryBudgetExceeded(
+                '{} queries exceed the budget of {}:\n{}'.format(
+                    len(self.queries), budget, '\n'.join(self.queries)
+                )
+            )
@@ -0,0 +1,136 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+class ReferenceTemplate:
+    """
+    The fixed part of a reference: its stream, action and lookup keys.
+
+    Templates are shared by every field producing the same shape of
+    reference so only the lookup values vary per row.
+    """
+
+    __slots__ = ('stream', 'action', 'keys')
+
+    def __init__(self, stream: Optional[str], action: str,
+                 keys: Tuple[str, ...]):
+        self.stream = stream
+        self.action = action
+        self.keys = keys
+
+    def render(self, values: Tuple[Any, ...]) -> Dict:
+        payload = {
+            'action': self.action
+        }
+        payload.update(zip(self.keys, values))
+
+        return {
+            'stream': self.stream,
+            'payload': payload
+        }
+
+    def __repr__(self):
+        return '<{} {} {} {}>'.format(
+            self.__class__.__name__, self.stream, self.action, self.keys
+        )
+
+
+@lru_cache(maxsize=None)
+def get_reference_template(stream: Optional[str], action: str,
+                           keys: Tuple[str, ...]) -> ReferenceTemplate:
+    return ReferenceTemplate(stream, action, keys)
+
+
+class Reference:
+    """
+    A reference kept as its template and lookup values.
+
+    It compares equal to the `{stream, payload}` dict it stands for and is
+    only turned into one when encoded with `ReferenceJSONEncoder`.
+    """
+
+    __slots__ = ('template', 'values')
+
+    def __init__(self, template: ReferenceTemplate,
+                 values: Tuple[Any, ...]):
+        self.template = template
+        self.values = values
+
+    @property
+    def stream(self) -> Optional[str]:
+        return self.template.stream
+
+    @property
+    def payload(self) -> Dict:
+        return self.as_dict()['payload']
+
+    def as_dict(self) -> Dict:
+        return self.template.render(self.values)
+
+    def _key(self):
+        template = self.template
+        return template.stream, template.action, template.keys, self.values
+
+    def __eq__(self, other):
+        if isinstance(other, Reference):
+            return self._key() == other._key()
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(self.__class__.__name__, self.as_dict())
+
+
+class ReferenceJSONEncoder(json.JSONEncoder):
+    """
+    JSON encoder that writes `Reference` objects in their `{stream,
+    payload}` form.
+    """
+
+    def default(self, o):
+        if isinstance(o, Reference):
+            return o.as_dict()
+        return super().default(o)
+
+
+class ReferenceTable:
+    """
+    Collects the distinct references of a response, each occurrence is
+    replaced by `{'$ref': <index into references>}`.
+    """
+
+    def __init__(self):
+        self.references = []  # type: List[Union[Dict, List, Reference]]
+        self._indexes = {}  # type: Dict[Any, int]
+
+    @staticmethod
+    def _key(reference: Union[Dict, List, Reference]):
+        if isinstance(reference, Reference):
+            return reference._key()
+        if isinstance(reference, list):
+            # a compact reference
+            return tuple(reference)
+        return (
+            reference['stream'], tuple(reference['payload'].items())
+        )
+
+    def add(self, reference: Union[Dict, List, Reference, None]) -> Any:
+        if reference is None:
+            return None
+        try:
+            key = self._key(reference)
+            index = self._indexes.get(key)
+        except TypeError:
+            # unhashable lookup values are left inline
+            return reference
+
+        if index is None:
+            index = len(self.references)
+            self.references.append(reference)
+            self._indexes[key] = index
+        return {'$ref': index}
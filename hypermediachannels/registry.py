@@ -0,0 +1,203 @@
+from typing import Iterable, List, Optional, Sequence, Type
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import Model
+
+from hypermediachannels.compact import get_compact_codec
+from hypermediachannels.fields import (
+    HyperChannelsApiManyRelationField,
+    HyperChannelsApiMixin,
+    HyperChannelsApiRelationField
+)
+from hypermediachannels.lookups import get_related_model
+from hypermediachannels.resolution import (
+    get_consumer_class,
+    warm_resolution_index
+)
+from hypermediachannels.serializers import (
+    HyperChannelsApiModelSerializer,
+    HyperlinkedIdentityField
+)
+
+
+def find_demultiplexers() -> List[type]:
+    """
+    Every demultiplexer class with applications, once the `ASGI_APPLICATION`
+    (and so its routing) has been imported.
+    """
+    from channels.routing import get_default_application
+    from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+
+    try:
+        get_default_application()
+    except ImproperlyConfigured:
+        pass
+
+    found = []
+    pending = [AsyncJsonWebsocketDemultiplexer]
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if getattr(cls, 'applications', None) and cls not in found:
+            found.append(cls)
+    return found
+
+
+def _validate_path(model: Optional[Type[Model]],
+                   attrs: Sequence[str]) -> Optional[str]:
+    """
+    Follow a lookup path through the model metadata, returning an error if
+    it names something the models do not have.
+    """
+    for attr in attrs:
+        if model is None:
+            # past a plain field, a property or a method
+            return None
+        try:
+            model = model._meta.get_field(attr).related_model
+        except FieldDoesNotExist:
+            if hasattr(model, attr):
+                return None
+            return '{} has no field or attribute {!r}'.format(
+                model.__name__, attr
+            )
+    return None
+
+
+def _get_target_model(field: HyperChannelsApiMixin,
+                      model: Type[Model]) -> Optional[Type[Model]]:
+    if isinstance(field, HyperlinkedIdentityField):
+        return model
+    queryset = getattr(
+        getattr(field, 'child_relation', field), 'queryset', None
+    )
+    if queryset is not None:
+        return queryset.model
+    return get_related_model(model, field.source_attrs)
+
+
+class _Checker:
+    """
+    Validates (and warms up) the hypermedia fields of the serializers of
+    one demultiplexer's consumers.
+    """
+
+    def __init__(self, demultiplexer_cls: type):
+        self.demultiplexer_cls = demultiplexer_cls
+        self.applications = demultiplexer_cls.applications
+        self.context = {'scope': {'demultiplexer_cls': demultiplexer_cls}}
+        self.errors = []  # type: List[str]
+
+    def error(self, where: str, message: str):
+        self.errors.append('{}: {}: {}'.format(
+            self.demultiplexer_cls.__name__, where, message
+        ))
+
+    def check(self) -> List[str]:
+        checked = set()
+        for application in self.applications.values():
+            serializer_cls = getattr(
+                get_consumer_class(application), 'serializer_class', None
+            )
+            if serializer_cls in checked or not (
+                    isinstance(serializer_cls, type) and issubclass(
+                        serializer_cls, HyperChannelsApiModelSerializer)):
+                continue
+            checked.add(serializer_cls)
+            self.check_serializer(serializer_cls)
+
+        warm_resolution_index(self.demultiplexer_cls)
+        if getattr(self.demultiplexer_cls, 'compact_references', False):
+            get_compact_codec(self.demultiplexer_cls)
+        return self.errors
+
+    def check_serializer(self, serializer_cls: type):
+        model = serializer_cls.Meta.model
+        serializer = serializer_cls(context=self.context)
+
+        for (name, field) in serializer.fields.items():
+            where = '{}.{}'.format(serializer_cls.__name__, name)
+            if isinstance(field, HyperChannelsApiManyRelationField):
+                target = field._related_model or _get_target_model(
+                    field, model
+                )
+                self.check_field(where, field, target, model, model)
+            elif isinstance(field, HyperChannelsApiRelationField):
+                target = _get_target_model(field, model)
+                self.check_field(where, field, target, target, model)
+
+        self.check_field(
+            '{}(many=True)'.format(serializer_cls.__name__),
+            serializer_cls(many=True, context=self.context),
+            model, model, None
+        )
+
+        serializer_cls.get_query_plan()
+        serializer_cls.get_many_query_plan()
+
+    def check_field(self, where: str, field: HyperChannelsApiMixin,
+                    target: Optional[Type[Model]],
+                    model: Optional[Type[Model]],
+                    parent_model: Optional[Type[Model]]):
+        """
+        `target` is the model referenced, `model` the one lookups read from
+        and `parent_model` the one `self.` lookups read from.
+        """
+        if field.stream_name is not None and \
+                field.stream_name not in self.applications:
+            self.error(where, 'stream {!r} is not one of the '
+                              'applications'.format(field.stream_name))
+            return
+        if target is None:
+            if field.stream_name is None:
+                self.error(where, 'the referenced model is unknown, set a '
+                                  '`stream_name`')
+            return
+
+        stream, application = field.resolve(target)
+        if stream is None:
+            self.error(where, 'no stream serves {}'.format(target.__name__))
+            return
+        field.get_reference_template(stream)
+
+        actions = getattr(
+            get_consumer_class(application), 'available_actions', None
+        )
+        if actions is not None and field.action_name not in actions:
+            self.error(where, 'action {!r} is not supported on stream '
+                              '{!r}'.format(field.action_name, stream))
+
+        for accessor in field.lookups:
+            error = _validate_path(
+                parent_model if accessor.from_parent else model,
+                accessor.attrs
+            )
+            if error is not None:
+                self.error(where, 'lookup {!r} of {!r}: {}'.format(
+                    accessor.lookup, accessor.key, error
+                ))
+
+
+def build_registry(demultiplexers: Optional[Iterable[type]] = None,
+                   fail: bool = True) -> List[str]:
+    """
+    Validate the hypermedia serializers of every consumer of the
+    `demultiplexers` (by default all of them, see `find_demultiplexers`)
+    and precompute their resolution indexes, lookups, reference templates
+    and query plans, so the first message does not pay for it.
+
+    Returns the problems found, raising `ImproperlyConfigured` listing
+    them unless `fail` is false.
+    """
+    if demultiplexers is None:
+        demultiplexers = find_demultiplexers()
+
+    errors = []  # type: List[str]
+    for demultiplexer_cls in demultiplexers:
+        errors.extend(_Checker(demultiplexer_cls).check())
+
+    if errors and fail:
+        raise ImproperlyConfigured(
+            'Invalid hypermedia configuration:\n{}'.format('\n'.join(errors))
+        )
+    return errors
@@ -0,0 +1,157 @@
+from functools import lru_cache
+from threading import RLock
+from typing import Dict, Tuple, Optional, Type, Iterable, Any, List
+from weakref import WeakKeyDictionary
+
+from django.db.models import Model
+
+
+Resolution = Tuple[Optional[str], Any]
+
+
+def get_consumer_class(application: Any) -> Any:
+    """
+    Return the consumer class behind a demultiplexer application.
+
+    Applications may be registered either as a consumer class or as the
+    ASGI callable returned by `Consumer.as_asgi()`.
+    """
+    return getattr(application, 'consumer_class', application)
+
+
+@lru_cache(maxsize=None)
+def get_model_distance(model_cls: Type[Model],
+                       other_model_cls: Type[Model]) -> Optional[int]:
+    """
+    Return the distance (in the inheritance tree between to models)
+
+    The distance is the position of `other_model_cls` in the MRO of
+    `model_cls` so grandparents in multi-table or proxy hierarchies (and
+    models reached through abstract mixins) are ranked behind closer
+    parents. Results are memoized per pair of models.
+    """
+    if model_cls == other_model_cls:
+        return 0
+
+    if not issubclass(model_cls, other_model_cls):
+        return None
+
+    return model_cls.__mro__.index(other_model_cls)
+
+
+class ResolutionIndex:
+    """
+    Maps model classes to the `(stream_name, application)` that serves them
+    for a single demultiplexer.
+
+    Entries are computed on first use (or up front with `warm`) so that
+    resolving a model is a dictionary lookup. The index remembers the
+    `applications` it was built from and reports itself stale once they
+    are replaced or streams are added or removed. Other changes need
+    `clear_resolution_indexes()`.
+    """
+
+    def __init__(self, applications: Dict[str, Any]):
+        self.applications = applications
+        self._size = len(applications)
+        self._candidates = self._build_candidates(applications)
+        self._entries = {}  # type: Dict[Type[Model], Resolution]
+
+    @staticmethod
+    def _build_candidates(
+            applications: Dict[str, Any]) -> List[Tuple[str, Any, Type[Model]]]:
+        candidates = []
+        for (stream, application) in applications.items():
+            queryset = getattr(
+                get_consumer_class(application), 'queryset', None
+            )
+            if queryset is None:
+                continue
+            candidates.append((stream, application, queryset.model))
+        return candidates
+
+    def is_stale(self, applications: Dict[str, Any]) -> bool:
+        # cheap enough for every reference, changes keeping the same dict
+        # and number of streams need an explicit clear
+        return applications is not self.applications or \
+            len(applications) != self._size
+
+    @property
+    def entries(self) -> Dict[Type[Model], Resolution]:
+        """
+        A copy of the models resolved so far.
+        """
+        return dict(self._entries)
+
+    def __contains__(self, model: Type[Model]) -> bool:
+        return model in self._entries
+
+    def resolve(self, model: Type[Model]) -> Resolution:
+        try:
+            return self._entries[model]
+        except KeyError:
+            pass
+
+        resolution = self._compute(model)
+        self._entries[model] = resolution
+        return resolution
+
+    def _compute(self, model: Type[Model]) -> Resolution:
+        best = None
+        for (stream, application, candidate) in self._candidates:
+            distance = get_model_distance(model, candidate)
+            if distance is None:
+                continue
+            # keep the first registered stream on ties
+            if best is None or distance < best[0]:
+                best = (distance, stream, application)
+
+        if best is None:
+            return None, None
+        _, stream, application = best
+        return stream, application
+
+    def warm(self, models: Iterable[Type[Model]]) -> 'ResolutionIndex':
+        for model in models:
+            self.resolve(model)
+        return self
+
+
+_indexes = WeakKeyDictionary()  # type: WeakKeyDictionary
+_lock = RLock()
+
+
+def get_resolution_index(demultiplexer_cls: type) -> ResolutionIndex:
+    """
+    Return the resolution index for a demultiplexer class, (re)building it
+    if its `applications` were replaced or resized since it was built.
+    """
+    index = _indexes.get(demultiplexer_cls)
+    applications = demultiplexer_cls.applications
+    if index is None or index.is_stale(applications):
+        with _lock:
+            index = _indexes.get(demultiplexer_cls)
+            if index is None or index.is_stale(applications):
+                index = ResolutionIndex(applications)
+                _indexes[demultiplexer_cls] = index
+    return index
+
+
+def warm_resolution_index(
+        demultiplexer_cls: type,
+        models: Optional[Iterable[Type[Model]]] = None) -> ResolutionIndex:
+    """
+    Build the resolution index for a demultiplexer ahead of the first
+    message, eg. when creating the ASGI application.
+
+    By default every installed model is resolved.
+    """
+    if models is None:
+        from django.apps import apps
+        models = apps.get_models()
+    return get_resolution_index(demultiplexer_cls).warm(models)
+
+
+def clear_resolution_indexes():
+    with _lock:
+        _indexes.clear()
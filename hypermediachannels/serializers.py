@@ -1,20 +1,186 @@
-from typing import Iterable, Dict, Any, List
+import copy
+from collections.abc import Mapping
+from functools import partial
+from itertools import islice
+from typing import Iterable, Iterator, Dict, Any, List, Optional, Tuple
 
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import QuerySet
 
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import Field, SkipField, get_error_detail
+from rest_framework.relations import ManyRelatedField
 from rest_framework.serializers import (
+    BaseSerializer,
+    ReturnDict,
     ModelSerializer,
     SerializerMetaclass,
     ListSerializer
 )
 
+try:
+    from rest_framework.fields import set_value
+except ImportError:
+    # DRF 3.15 made it a `Serializer` method
+    set_value = None
+
+from hypermediachannels.aio import aiterate, call_or_defer
+from hypermediachannels.compiler import CompiledRepresentation
+from hypermediachannels.concurrency import DEFAULT_MAX_WORKERS, gather
 from hypermediachannels.fields import (
+    HyperChannelsApiManyRelationField,
     HyperChannelsApiRelationField,
     HyperChannelsApiMixin
 )
+from hypermediachannels.includes import (
+    IncludeCollector,
+    parse_include_paths
+)
+from hypermediachannels.lookups import compile_kwarg_mappings
+from hypermediachannels.planning import (
+    QueryPlan,
+    build_query_plan,
+    build_reference_query_plan,
+    get_lookup_columns
+)
+from hypermediachannels.querycheck import (
+    QUERY_TRACKER,
+    QueryTracker,
+    is_tracking,
+    query_checks_enabled
+)
+from hypermediachannels.references import ReferenceTable
+
+
+def _copy_field(field: Field) -> Field:
+    """
+    Copy an unbound field for a new serializer instance.
+
+    Plain fields and hypermedia fields only gain state when they are bound
+    so a shallow copy is enough; anything holding child fields (nested
+    serializers, `ListField`, ...) is deep-copied.
+    """
+    if isinstance(field, BaseSerializer) or hasattr(field, 'child'):
+        return copy.deepcopy(field)
+
+    clone = copy.copy(field)
+    if isinstance(field, ManyRelatedField):
+        clone.child_relation = copy.copy(field.child_relation)
+        clone.child_relation.parent = clone
+    return clone
+
+
+class QueryCheckMixin:
+    """
+    With the `HYPERMEDIA_QUERY_CHECKS` setting a root serializer records
+    the queries of `data`, warns about queries repeated for each item
+    (`NPlusOneWarning`) and raises `QueryBudgetExceeded` when there are more
+    than `Meta.query_budget`.
+    """
+
+    @property
+    def data(self):
+        if self.parent is not None or not query_checks_enabled() or \
+                QUERY_TRACKER in self.context:
+            return super().data
+
+        tracker = QueryTracker()
+        self._context[QUERY_TRACKER] = tracker
+        try:
+            with tracker.track():
+                data = super().data
+        finally:
+            del self._context[QUERY_TRACKER]
+        tracker.check(getattr(self, 'child', self).Meta)
+        return data
+
+    def to_representation(self, instance):
+        if not is_tracking():
+            return super().to_representation(instance)
+
+        tracker = self.context.get(QUERY_TRACKER)
+        if tracker is None:
+            return super().to_representation(instance)
+        # list serializers come here for each item
+        with tracker.item(self):
+            return super().to_representation(instance)
+
+
+class ReferenceTableMixin:
+    """
+    Lets a root serializer emit each distinct reference once.
 
+    Enabled with `dedupe_references` in the context or on the `Meta`,
+    `data` is then `{'references': [...], 'data': ...}` where every
+    reference in `data` is replaced by `{'$ref': <index>}`.
+    """
+
+    def get_dedupe_references(self) -> bool:
+        meta = getattr(self, 'child', self).Meta
+        return self.context.get(
+            'dedupe_references', getattr(meta, 'dedupe_references', False)
+        )
+
+    @property
+    def data(self):
+        if self.parent is not None or not self.get_dedupe_references():
+            return super().data
+
+        if getattr(self, '_deduplicated_data', None) is None:
+            self._reference_table = ReferenceTable()
+            data = super().data
+            self._deduplicated_data = ReturnDict({
+                'references': self._reference_table.references,
+                'data': data
+            }, serializer=self)
+        return self._deduplicated_data
+
+
+class IncludeMixin:
+    """
+    Lets a serializer embed the objects some of its references point to.
+
+    The field names to include come from `include` in the context or on
+    the `Meta`, dotted paths (eg. `team.owner`) include references of the
+    included objects. Each included reference gains a `data` key holding
+    the object as serialized by its stream's consumer.
+    """
 
-class HyperChannelsApiListSerializer(HyperChannelsApiMixin,
+    def get_include_paths(self) -> Tuple[str, ...]:
+        meta = getattr(self, 'child', self).Meta
+        return tuple(
+            self.context.get('include', getattr(meta, 'include', ()))
+        )
+
+    def get_includes(self) -> Dict[str, Tuple[str, ...]]:
+        includes = self.__dict__.get('_includes')
+        if includes is None:
+            includes = self._includes = parse_include_paths(
+                self.get_include_paths()
+            )
+        return includes
+
+    @property
+    def data(self):
+        if self.parent is not None or not self.get_include_paths() or \
+                'hypermedia_includes' in self.context:
+            return super().data
+
+        if getattr(self, '_data', None) is None:
+            collector = IncludeCollector()
+            self._context['hypermedia_includes'] = collector
+            try:
+                super().data
+                collector.resolve(self.context)
+            finally:
+                del self._context['hypermedia_includes']
+        return super().data
+
+
+class HyperChannelsApiListSerializer(QueryCheckMixin,
+                                     ReferenceTableMixin,
+                                     IncludeMixin,
+                                     HyperChannelsApiMixin,
                                      ListSerializer):
     @property
     def stream_name(self):
@@ -31,13 +197,128 @@ class HyperChannelsApiListSerializer(HyperChannelsApiMixin,
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def get_includes(self) -> Optional[Tuple[str, ...]]:
+        """
+        The include paths within each item when the list is the root of a
+        response including them, otherwise `None`.
+
+        Every item is then included, `include=('user',)` on a list of
+        profiles sends each profile with its user.
+        """
+        if self.parent is not None or \
+                'hypermedia_includes' not in self.context:
+            return None
+        return self.get_include_paths()
+
     def to_representation(self, queryset: QuerySet) -> List[Dict]:
+        if getattr(self.child.Meta, 'apply_query_plan', True):
+            columns = self._get_projection(queryset)
+            if columns is not None:
+                return self._project(queryset, columns)
+            queryset = self.child.get_many_query_plan().apply(queryset)
         return [
             # strange but we need to use old style `super` here
             super(HyperChannelsApiListSerializer, self).to_representation(item)
             for item in queryset
         ]
 
+    async def ato_representation(self, queryset: QuerySet) -> List[Dict]:
+        """
+        `to_representation` for async callers, reading the queryset without
+        blocking the event loop.
+        """
+        if getattr(self.child.Meta, 'apply_query_plan', True):
+            columns = self._get_projection(queryset)
+            if columns is not None:
+                stream_name, consumer = self.resolve(queryset.model)
+                if (stream_name, consumer) == (None, None):
+                    return [
+                        None async for _ in aiterate(queryset.values_list('pk'))
+                    ]
+                build_reference = self.get_reference_builder(stream_name)
+                return [
+                    build_reference(row)
+                    async for row in aiterate(queryset.values_list(*columns))
+                ]
+            queryset = self.child.get_many_query_plan().apply(queryset)
+
+        if isinstance(queryset, QuerySet):
+            queryset = [item async for item in aiterate(queryset)]
+        represent = super(HyperChannelsApiListSerializer, self).to_representation
+        return [await call_or_defer(represent, item) for item in queryset]
+
+    def iter_representation(
+            self, queryset: QuerySet,
+            chunk_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Yield the representation of `queryset` in lists of at most
+        `chunk_size` references (`Meta.stream_chunk_size`, 1000 by default).
+
+        Querysets are read with `iterator()` so memory stays bounded
+        however many rows there are.
+        """
+        if chunk_size is None:
+            chunk_size = getattr(self.child.Meta, 'stream_chunk_size', 1000)
+
+        items = self._iter_items(queryset, chunk_size)
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _iter_items(self, queryset: QuerySet,
+                    chunk_size: int) -> Iterator[Optional[Dict]]:
+        if getattr(self.child.Meta, 'apply_query_plan', True):
+            columns = self._get_projection(queryset)
+            if columns is not None:
+                stream_name, consumer = self.resolve(queryset.model)
+                if (stream_name, consumer) == (None, None):
+                    for _ in queryset.values_list('pk').iterator(chunk_size):
+                        yield None
+                    return
+                build_reference = self.get_reference_builder(stream_name)
+                for row in queryset.values_list(*columns).iterator(chunk_size):
+                    yield build_reference(row)
+                return
+            queryset = self.child.get_many_query_plan().apply(queryset)
+
+        if isinstance(queryset, QuerySet):
+            queryset = queryset.iterator(chunk_size)
+        for item in queryset:
+            yield super(
+                HyperChannelsApiListSerializer, self
+            ).to_representation(item)
+
+    def _get_projection(self, queryset: QuerySet) -> Optional[Tuple[str, ...]]:
+        """
+        The columns to fetch with `values_list` when every lookup reads a
+        local column, `None` if full instances are needed.
+        """
+        if self.get_includes() is not None:
+            # included items are loaded from their instances
+            return None
+        if not isinstance(queryset, QuerySet) or \
+                queryset._result_cache is not None or \
+                queryset._fields is not None or \
+                queryset._prefetch_related_lookups or \
+                queryset.query.distinct:
+            # distinct rows of fewer columns could merge items
+            return None
+        return get_lookup_columns(queryset.model, self.lookups)
+
+    def _project(self, queryset: QuerySet,
+                 columns: Tuple[str, ...]) -> List[Dict]:
+        stream_name, consumer = self.resolve(queryset.model)
+        if (stream_name, consumer) == (None, None):
+            return [None for _ in queryset.values_list('pk')]
+
+        build_reference = self.build_reference
+        return [
+            build_reference(stream_name, row)
+            for row in queryset.values_list(*columns)
+        ]
+
 
 class HyperChannelsApiSerializerMetaclass(SerializerMetaclass):
     def __new__(mcs, name: str, bases: Iterable[type],
@@ -71,6 +352,9 @@ class HyperlinkedIdentityField(HyperChannelsApiRelationField):
 
 
 class HyperChannelsApiModelSerializer(
+    QueryCheckMixin,
+    ReferenceTableMixin,
+    IncludeMixin,
     ModelSerializer,
         metaclass=HyperChannelsApiSerializerMetaclass):
 
@@ -79,6 +363,96 @@ class HyperChannelsApiModelSerializer(
     serializer_url_field = HyperlinkedIdentityField
 
 
+    def get_fields(self):
+        """
+        With `Meta.cache_fields = True` the fields are built once per class
+        and copied for every serializer instance.
+        """
+        if not getattr(self.Meta, 'cache_fields', False):
+            return super().get_fields()
+
+        cls = self.__class__
+        fields = cls.__dict__.get('_field_plan')
+        if fields is None:
+            fields = super().get_fields()
+            cls._field_plan = fields
+        return {
+            name: _copy_field(field) for (name, field) in fields.items()
+        }
+
+    def to_representation(self, instance):
+        """
+        With `Meta.compiled = True` instances are serialized by a function
+        generated for this serializer's fields rather than DRF's generic
+        per-field loop.
+        """
+        if not getattr(self.Meta, 'compiled', False):
+            return super().to_representation(instance)
+
+        compiled = self.__dict__.get('_compiled_representation')
+        if compiled is None:
+            compiled = CompiledRepresentation(self)
+            self._compiled_representation = compiled
+        return compiled(instance)
+
+    def to_internal_value(self, data):
+        """
+        With `Meta.concurrent_lookups = True` the hypermedia relation fields
+        are validated concurrently on a bounded thread pool (of
+        `Meta.max_lookup_workers` threads). Errors are still reported for
+        every field.
+        """
+        if not getattr(self.Meta, 'concurrent_lookups', False) or \
+                not isinstance(data, Mapping):
+            return super().to_internal_value(data)
+
+        fields = list(self._writable_fields)
+        relations = [
+            field for field in fields if isinstance(field, (
+                HyperChannelsApiRelationField,
+                HyperChannelsApiManyRelationField
+            ))
+        ]
+        outcomes = dict(zip(
+            (field.field_name for field in relations),
+            gather([
+                partial(field.run_validation, field.get_value(data))
+                for field in relations
+            ], getattr(self.Meta, 'max_lookup_workers', DEFAULT_MAX_WORKERS))
+        ))
+
+        ret = {}
+        errors = {}
+        set_field_value = getattr(self, 'set_value', set_value)
+        for field in fields:
+            validate_method = getattr(
+                self, 'validate_' + field.field_name, None
+            )
+            try:
+                if field.field_name in outcomes:
+                    validated_value, exc = outcomes[field.field_name]
+                    if exc is not None:
+                        raise exc
+                else:
+                    validated_value = field.run_validation(
+                        field.get_value(data)
+                    )
+                if validate_method is not None:
+                    validated_value = validate_method(validated_value)
+            except ValidationError as exc:
+                errors[field.field_name] = exc.detail
+            except DjangoValidationError as exc:
+                errors[field.field_name] = get_error_detail(exc)
+            except SkipField:
+                pass
+            else:
+                set_field_value(ret, field.source_attrs, validated_value)
+
+        if errors:
+            raise ValidationError(errors)
+
+        return ret
+
     def get_default_field_names(self, declared_fields, model_info):
         """
         Return the default list of field names that will be used if the
@@ -99,3 +473,42 @@ class HyperChannelsApiModelSerializer(
         field_kwargs = {}
 
         return field_class, field_kwargs
+
+    @classmethod
+    def get_query_plan(cls) -> QueryPlan:
+        """
+        The `select_related`/`prefetch_related`/`only` needed to serialize
+        instances with this serializer.
+        """
+        plan = cls.__dict__.get('_query_plan')
+        if plan is None:
+            plan = build_query_plan(cls())
+            cls._query_plan = plan
+        return plan
+
+    @classmethod
+    def get_many_query_plan(cls) -> QueryPlan:
+        """
+        The query plan used when serializing with `many=True`, where only
+        the `many_kwarg_mappings` are read from each instance.
+        """
+        plan = cls.__dict__.get('_many_query_plan')
+        if plan is None:
+            plan = build_reference_query_plan(
+                cls.Meta.model,
+                compile_kwarg_mappings(getattr(
+                    cls.Meta,
+                    'many_kwarg_mappings',
+                    HyperChannelsApiMixin.kwarg_mappings
+                ))
+            )
+            cls._many_query_plan = plan
+        return plan
+
+    @classmethod
+    def optimize_queryset(cls, queryset: QuerySet) -> QuerySet:
+        """
+        Apply the query plan to a queryset, eg. in a consumer's
+        `get_queryset`.
+        """
+        return cls.get_query_plan().apply(queryset)
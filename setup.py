@@ -9,7 +9,7 @@ setup(
     description="Hyper Media Channels Rest Framework.",
     long_description=open('README.rst').read(),
     license='MIT',
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks']),
     include_package_data=True,
     install_requires=[
         'channels>=3.0.0',
@@ -1,3 +1,4 @@
+import pytest
 from django.conf import settings
 
 
@@ -20,3 +21,22 @@ def pytest_configure():
 
         MIDDLEWARE_CLASSES=[]
     )
+
+
+@pytest.fixture
+def create_profiles():
+    """
+    A function creating `count` profiles (and their users) in one team.
+    """
+    from tests.models import User, UserProfile, Team
+
+    def create(count):
+        team = Team.objects.create(name='The Team')
+        return [
+            UserProfile.objects.create(
+                user=User.objects.create(username='user{}'.format(index)),
+                team=team
+            )
+            for index in range(count)
+        ]
+    return create
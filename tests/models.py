@@ -29,3 +29,27 @@ class UserProfile(models.Model):
         'UserProfile',
         related_name='friended'
     )
+
+
+class Staff(User):
+    role = models.CharField(max_length=255)
+
+
+class TeamLead(Staff):
+    pass
+
+
+class ActiveUser(User):
+    class Meta:
+        proxy = True
+
+
+class TimestampedMixin(models.Model):
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class Contractor(TimestampedMixin, Staff):
+    agency = models.CharField(max_length=255)
@@ -0,0 +1,124 @@
+import pytest
+from channels.db import database_sync_to_async
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from djangochannelsrestframework.mixins import RetrieveModelMixin
+from rest_framework.exceptions import ValidationError
+
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username'
+        )
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'friends'
+        )
+
+        many_kwarg_mappings = {
+            'username': 'user.username'
+        }
+
+
+class UserConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+
+
+class UserProfileConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi()
+    }
+
+
+CONTEXT = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+
+
+def reference(stream, pk):
+    return {
+        'stream': stream,
+        'payload': {'action': 'retrieve', 'pk': pk}
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_ato_representation(create_profiles):
+    profiles = await database_sync_to_async(create_profiles)(3)
+
+    for (serializer_cls, queryset) in (
+            (UserSerializer, User.objects.order_by('pk')),
+            (UserProfileSerializer, UserProfile.objects.order_by('pk'))):
+        serializer = serializer_cls(
+            instance=queryset, many=True, context=CONTEXT
+        )
+        expected = await database_sync_to_async(lambda: serializer.data)()
+        assert await serializer.ato_representation(queryset) == expected
+
+    # `user` is not loaded, so the lookups fall back to a database thread
+    loaded = await database_sync_to_async(list)(
+        UserProfile.objects.only('pk', 'user_id').order_by('pk')
+    )
+    serializer = UserProfileSerializer(
+        instance=loaded, many=True, context=CONTEXT
+    )
+    assert await serializer.ato_representation(loaded) == [
+        {
+            'stream': 'profiles',
+            'payload': {
+                'action': 'retrieve',
+                'username': profile.user.username
+            }
+        }
+        for profile in profiles
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_ato_internal_value(create_profiles):
+    profiles = await database_sync_to_async(create_profiles)(3)
+    fields = UserProfileSerializer(context=CONTEXT).fields
+
+    assert await fields['user'].ato_internal_value(
+        profiles[0].user_id
+    ) == profiles[0].user
+    assert await fields['user'].ato_internal_value(
+        reference('users', profiles[1].user_id)
+    ) == profiles[1].user
+
+    assert await fields['friends'].ato_internal_value([
+        reference('profiles', profiles[2].pk),
+        profiles[0].pk,
+        reference('profiles', profiles[1].pk),
+    ]) == [profiles[2], profiles[0], profiles[1]]
+
+    with pytest.raises(ValidationError) as excinfo:
+        await fields['user'].ato_internal_value(9999)
+    assert excinfo.value.detail == ['Not found']
+
+    with pytest.raises(ValidationError) as excinfo:
+        await fields['friends'].ato_internal_value([profiles[0].pk, 9999])
+    assert excinfo.value.detail == ['Not found: 9999']
+
+    with pytest.raises(ValidationError) as excinfo:
+        await fields['user'].ato_internal_value(reference('users', 9999))
+    assert excinfo.value.detail == ['Not found']
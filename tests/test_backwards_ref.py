@@ -1,6 +1,7 @@
 import pytest
 from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
 from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from rest_framework.relations import ManyRelatedField
 
 from hypermediachannels.serializers import HyperChannelsApiModelSerializer
 from tests.models import User, UserProfile, Team
@@ -144,4 +145,52 @@ def test_many_to_many():
             },
             'stream': 'profiles'
         }
-    }
\ No newline at end of file
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_use_relation_metadata(monkeypatch):
+
+    class UserProfileSerializer(HyperChannelsApiModelSerializer):
+        class Meta:
+            model = UserProfile
+            fields = (
+                '@id',
+                'friended'
+            )
+
+            extra_kwargs = {
+                'friended': {
+                    'use_relation_metadata': True,
+                    'kwarg_mappings': {
+                        'user_pk': 'self.user.pk',
+                    }
+                },
+            }
+
+    user = User.objects.create(
+        username='boby'
+    )
+
+    profile = UserProfile.objects.create(
+        user=user,
+        team=Team.objects.create(name='The Team')
+    )
+
+    def get_attribute(self, instance):
+        raise AssertionError('related manager should not be used')
+
+    monkeypatch.setattr(ManyRelatedField, 'get_attribute', get_attribute)
+
+    data = UserProfileSerializer(
+        instance=profile,
+        context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    ).data
+
+    assert data['friended'] == {
+        'payload': {
+            'action': 'list',
+            'user_pk': user.pk
+        },
+        'stream': 'profiles'
+    }
@@ -0,0 +1,154 @@
+import pytest
+from channels.testing.websocket import WebsocketCommunicator
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from djangochannelsrestframework.mixins import RetrieveModelMixin
+from rest_framework.exceptions import ValidationError
+
+from hypermediachannels.compact import get_compact_codec
+from hypermediachannels.demultiplexer import HyperMediaDemultiplexerMixin
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username'
+        )
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'team',
+            'friends'
+        )
+
+        extra_kwargs = {
+            'team': {
+                'kwarg_mappings': {
+                    'team_pk': 'pk',
+                    'user_pk': 'self.user.pk'
+                }
+            }
+        }
+
+
+class UserConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+
+
+class UserProfileConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class TeamConsumer(GenericAsyncAPIConsumer):
+    queryset = Team.objects.all()
+
+
+class MainDemultiplexer(HyperMediaDemultiplexerMixin,
+                        AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi(),
+        'teams': TeamConsumer.as_asgi()
+    }
+
+
+def get_scope(compact):
+    return {
+        'demultiplexer_cls': MainDemultiplexer,
+        'hypermedia_compact': compact
+    }
+
+
+def test_dictionary():
+    dictionary = get_compact_codec(MainDemultiplexer).dictionary
+
+    assert dictionary['streams'] == ['users', 'profiles', 'teams']
+    assert {'retrieve', 'list'} <= set(dictionary['actions'])
+    assert ['pk'] in dictionary['shapes']
+    assert ['team_pk', 'user_pk'] in dictionary['shapes']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_compact_references():
+    team = Team.objects.create(name='The Team')
+    profile = UserProfile.objects.create(
+        user=User.objects.create(username='bob'), team=team
+    )
+
+    expected = UserProfileSerializer(
+        instance=profile, context={'scope': get_scope(False)}
+    ).data
+    data = UserProfileSerializer(
+        instance=profile, context={'scope': get_scope(True)}
+    ).data
+
+    codec = get_compact_codec(MainDemultiplexer)
+    dictionary = codec.dictionary
+    assert data['team'] == [
+        dictionary['streams'].index('teams'),
+        dictionary['actions'].index('retrieve'),
+        dictionary['shapes'].index(['team_pk', 'user_pk']),
+        team.pk,
+        profile.user.pk
+    ]
+    assert {
+        name: codec.decode(value) for (name, value) in data.items()
+    } == expected
+
+
+@pytest.mark.django_db(transaction=True)
+def test_compact_to_internal_value():
+    team = Team.objects.create(name='The Team')
+    users = [User.objects.create(username=name) for name in ('a', 'b')]
+    profiles = [
+        UserProfile.objects.create(user=user, team=team) for user in users
+    ]
+
+    serializer = UserProfileSerializer(
+        instance=profiles[0], context={'scope': get_scope(True)}
+    )
+    data = serializer.data
+
+    fields = serializer.fields
+    assert fields['user'].to_internal_value(data['user']) == users[0]
+    assert fields['friends'].to_internal_value(
+        [data['@id'], profiles[1].pk]
+    ) == profiles
+
+    with pytest.raises(ValidationError):
+        fields['user'].to_internal_value([99, 0, 0, 1])
+    with pytest.raises(ValidationError):
+        fields['user'].to_internal_value(data['user'] + [1])
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_negotiation():
+    communicator = WebsocketCommunicator(
+        MainDemultiplexer.as_asgi(), '/', subprotocols=['hypermedia.compact']
+    )
+    connected, subprotocol = await communicator.connect()
+    assert connected
+    assert subprotocol == 'hypermedia.compact'
+    assert await communicator.receive_json_from() == {
+        '@hypermedia': get_compact_codec(MainDemultiplexer).dictionary
+    }
+    await communicator.disconnect()
+
+    communicator = WebsocketCommunicator(MainDemultiplexer.as_asgi(), '/')
+    connected, subprotocol = await communicator.connect()
+    assert connected
+    assert subprotocol is None
+    assert await communicator.receive_nothing()
+    await communicator.disconnect()
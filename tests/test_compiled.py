@@ -0,0 +1,157 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from rest_framework import serializers
+
+from hypermediachannels.fields import HyperChannelsApiRelationField
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team, Staff, TeamLead
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username',
+            'profile'
+        )
+
+        extra_kwargs = {
+            'profile': {
+                'kwarg_mappings': {
+                    'user_pk': 'self.pk',
+                }
+            },
+        }
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    username = serializers.CharField(source='user.username', default=None)
+    team_name = serializers.SerializerMethodField()
+    team = HyperChannelsApiRelationField(
+        read_only=True,
+        kwarg_mappings={
+            'name': 'name',
+            'member_pk': 'self.user.pk'
+        }
+    )
+
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'created',
+            'user',
+            'username',
+            'team',
+            'team_name',
+            'friends',
+            'friended'
+        )
+
+        extra_kwargs = {
+            'user': {
+                'kwarg_mappings': {
+                    'username': 'username',
+                    'profile_pk': 'self.pk',
+                    'team_pk': 'self.team.pk'
+                }
+            },
+        }
+
+    def get_team_name(self, instance):
+        return instance.team.name
+
+
+class StaffSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = Staff
+        fields = (
+            '@id',
+            'username',
+            'role',
+            'user_ptr'
+        )
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+
+
+class StaffConsumer(GenericAsyncAPIConsumer):
+    queryset = Staff.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer,
+        'profiles': UserProfileConsumer,
+        'staff': StaffConsumer
+    }
+
+
+def compiled(serializer_class):
+    return type(
+        'Compiled' + serializer_class.__name__,
+        (serializer_class,),
+        {
+            'Meta': type(
+                'Meta', (serializer_class.Meta,), {'compiled': True}
+            )
+        }
+    )
+
+
+def assert_same_representation(serializer_class, instances):
+    context = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    compiled_class = compiled(serializer_class)
+
+    for instance in instances:
+        expected = serializer_class(instance=instance, context=context).data
+        data = compiled_class(instance=instance, context=context).data
+        assert data == expected
+        assert list(data.keys()) == list(expected.keys())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_compiled_representation():
+    team = Team.objects.create(
+        name='The Team'
+    )
+    user = User.objects.create(username='bob')
+    staff = Staff.objects.create(username='alice', role='admin')
+    lead = TeamLead.objects.create(username='eve', role='lead')
+
+    profiles = [
+        UserProfile.objects.create(user=user, team=team),
+        UserProfile.objects.create(user=None, team=team),
+        UserProfile.objects.create(user=staff, team=team),
+    ]
+    profiles[0].friends.add(profiles[1])
+
+    assert_same_representation(
+        UserSerializer, [user, User.objects.get(pk=staff.pk)]
+    )
+    assert_same_representation(UserProfileSerializer, profiles)
+    assert_same_representation(
+        StaffSerializer, [staff, lead, Staff.objects.get(pk=lead.pk)]
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_compiled_many():
+    user = User.objects.create(username='bob')
+    context = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+
+    assert compiled(UserSerializer)(
+        instance=User.objects.all(), many=True, context=context
+    ).data == UserSerializer(
+        instance=User.objects.all(), many=True, context=context
+    ).data == [
+        {'stream': 'users', 'payload': {'action': 'retrieve', 'pk': user.pk}}
+    ]
@@ -0,0 +1,155 @@
+import threading
+
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from django.db import transaction
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from djangochannelsrestframework.mixins import RetrieveModelMixin
+from rest_framework.exceptions import ValidationError
+
+from hypermediachannels.concurrency import gather
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+threads = []
+
+
+class RecordingConsumerMixin:
+    def get_object(self, **kwargs):
+        threads.append(threading.current_thread().name)
+        return super().get_object(**kwargs)
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'team',
+            'friends'
+        )
+
+        extra_kwargs = {
+            'friends': {'concurrent_lookups': True}
+        }
+
+        concurrent_lookups = True
+
+
+class UserConsumer(RecordingConsumerMixin, RetrieveModelMixin,
+                   GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+
+
+class UserProfileConsumer(RecordingConsumerMixin, RetrieveModelMixin,
+                          GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class OtherUserProfileConsumer(RecordingConsumerMixin, RetrieveModelMixin,
+                               GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+
+
+class TeamConsumer(RecordingConsumerMixin, RetrieveModelMixin,
+                   GenericAsyncAPIConsumer):
+    queryset = Team.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi(),
+        'other_profiles': OtherUserProfileConsumer.as_asgi(),
+        'teams': TeamConsumer.as_asgi()
+    }
+
+
+CONTEXT = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+
+
+def reference(stream, pk):
+    return {
+        'stream': stream,
+        'payload': {'action': 'retrieve', 'pk': pk}
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gather():
+    def fail(message):
+        raise ValueError(message)
+
+    outcomes = gather([
+        lambda: 1, lambda: fail('first'), lambda: fail('second')
+    ])
+    assert outcomes[0] == (1, None)
+    assert [str(exc) for (_, exc) in outcomes[1:]] == ['first', 'second']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_references(create_profiles):
+    profiles = create_profiles(2)
+    field = UserProfileSerializer(context=CONTEXT).fields['friends']
+
+    del threads[:]
+    assert field.to_internal_value([
+        reference('profiles', profiles[1].pk),
+        reference('other_profiles', profiles[0].pk),
+    ]) == [profiles[1], profiles[0]]
+    assert len(threads) == 2
+    assert all(name.startswith('hypermedia-lookup') for name in threads)
+
+    # the error of the first failing stream is raised
+    for _ in range(5):
+        with pytest.raises(ValidationError) as excinfo:
+            field.to_internal_value([
+                reference('profiles', profiles[1].pk),
+                {
+                    'stream': 'other_profiles',
+                    'payload': {'action': 'retrieve'}
+                },
+                reference('profiles', 9999),
+            ])
+        assert excinfo.value.detail == ['Not found']
+
+    # other threads can not see the transaction
+    del threads[:]
+    with transaction.atomic():
+        assert field.to_internal_value([
+            reference('profiles', profiles[1].pk),
+            reference('other_profiles', profiles[0].pk),
+        ]) == [profiles[1], profiles[0]]
+    assert threads == [threading.current_thread().name] * 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_fields(create_profiles):
+    profiles = create_profiles(2)
+
+    del threads[:]
+    serializer = UserProfileSerializer(data={
+        'user': reference('users', profiles[0].user_id),
+        'team': reference('teams', profiles[0].team_id),
+        'friends': [reference('profiles', profiles[1].pk)]
+    }, context=CONTEXT)
+    assert serializer.is_valid(), serializer.errors
+    assert serializer.validated_data == {
+        'user': profiles[0].user,
+        'team': profiles[0].team,
+        'friends': [profiles[1]]
+    }
+    assert len(threads) == 3
+
+    serializer = UserProfileSerializer(data={
+        'user': reference('users', 9999),
+        'team': reference('teams', profiles[0].team_id),
+        'friends': [reference('profiles', 9999)]
+    }, context=CONTEXT)
+    assert not serializer.is_valid()
+    assert serializer.errors == {
+        'user': ['Not found'],
+        'friends': ['Not found']
+    }
@@ -0,0 +1,109 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+from hypermediachannels.planning import QueryPlan
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import UserProfile
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'friends'
+        )
+
+        extra_kwargs = {
+            'friends': {
+                'include_count': True,
+                'kwarg_mappings': {
+                    'friend_of': 'self.pk'
+                }
+            }
+        }
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'profiles': UserProfileConsumer
+    }
+
+
+def serialize(profiles):
+    return [
+        UserProfileSerializer(
+            instance=profile,
+            context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+        ).data
+        for profile in profiles
+    ]
+
+
+def test_query_plan():
+    assert UserProfileSerializer.get_query_plan() == QueryPlan(
+        UserProfile,
+        only=('id',),
+        counts={'hypermedia_friends_count': 'friends'}
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counts(django_assert_num_queries, create_profiles):
+    profiles = create_profiles(4)
+    profiles[0].friends.set(profiles[1:])
+    profiles[1].friends.set(profiles[2:])
+
+    # one query for the profiles and a COUNT per profile
+    with django_assert_num_queries(5):
+        expected = serialize(UserProfile.objects.order_by('pk'))
+
+    assert [item['friends']['count'] for item in expected] == [3, 2, 0, 0]
+    assert expected[0]['friends'] == {
+        'stream': 'profiles',
+        'payload': {'action': 'list', 'friend_of': profiles[0].pk},
+        'count': 3
+    }
+
+    with django_assert_num_queries(1):
+        data = serialize(UserProfileSerializer.optimize_queryset(
+            UserProfile.objects.order_by('pk')
+        ))
+
+    assert data == expected
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counts_with_dedupe(create_profiles):
+    profiles = create_profiles(2)
+    profiles[0].friends.set(profiles[1:])
+
+    data = UserProfileSerializer(
+        instance=profiles[0],
+        context={
+            'scope': {'demultiplexer_cls': MainDemultiplexer},
+            'dedupe_references': True
+        }
+    ).data
+
+    # references with a count are sent inline, not through the table
+    assert data == {
+        'references': [{
+            'stream': 'profiles',
+            'payload': {'action': 'retrieve', 'pk': profiles[0].pk}
+        }],
+        'data': {
+            '@id': {'$ref': 0},
+            'friends': {
+                'stream': 'profiles',
+                'payload': {'action': 'list', 'friend_of': profiles[0].pk},
+                'count': 1
+            }
+        }
+    }
@@ -0,0 +1,110 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+from hypermediachannels.fields import HyperChannelsApiRelationField
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    squad = HyperChannelsApiRelationField(source='team', read_only=True)
+
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'team',
+            'squad'
+        )
+
+        dedupe_references = True
+
+        many_stream_name = 'teams'
+        many_kwarg_mappings = {
+            'pk': 'team.pk'
+        }
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+
+
+class TeamConsumer(GenericAsyncAPIConsumer):
+    queryset = Team.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer,
+        'profiles': UserProfileConsumer,
+        'teams': TeamConsumer
+    }
+
+
+def team_reference(team):
+    return {'stream': 'teams', 'payload': {'action': 'retrieve', 'pk': team.pk}}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dedupe_object():
+    team = Team.objects.create(name='The Team')
+    profile = UserProfile.objects.create(team=team)
+
+    data = UserProfileSerializer(
+        instance=profile,
+        context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    ).data
+
+    assert data == {
+        'references': [
+            {
+                'stream': 'profiles',
+                'payload': {'action': 'retrieve', 'pk': profile.pk}
+            },
+            team_reference(team)
+        ],
+        'data': {
+            '@id': {'$ref': 0},
+            'team': {'$ref': 1},
+            'squad': {'$ref': 1}
+        }
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dedupe_many():
+    teams = [Team.objects.create(name='Team {}'.format(i)) for i in range(2)]
+    for team in (teams[0], teams[1], teams[0], teams[0]):
+        UserProfile.objects.create(team=team)
+
+    data = UserProfileSerializer(
+        instance=UserProfile.objects.order_by('pk'),
+        many=True,
+        context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    ).data
+
+    assert data == {
+        'references': [team_reference(teams[0]), team_reference(teams[1])],
+        'data': [{'$ref': 0}, {'$ref': 1}, {'$ref': 0}, {'$ref': 0}]
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dedupe_disabled_by_context():
+    team = Team.objects.create(name='The Team')
+    profile = UserProfile.objects.create(team=team)
+
+    data = UserProfileSerializer(
+        instance=profile,
+        context={
+            'scope': {'demultiplexer_cls': MainDemultiplexer},
+            'dedupe_references': False
+        }
+    ).data
+
+    assert data['squad'] == data['team'] == team_reference(team)
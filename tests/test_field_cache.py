@@ -0,0 +1,70 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'friends'
+        )
+
+        extra_kwargs = {
+            'user': {
+                'kwarg_mappings': {
+                    'username': 'username',
+                    'team_pk': 'self.team.pk'
+                }
+            },
+        }
+
+
+class CachedUserProfileSerializer(UserProfileSerializer):
+    class Meta(UserProfileSerializer.Meta):
+        cache_fields = True
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer,
+        'profiles': UserProfileConsumer
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cached_fields():
+    profile = UserProfile.objects.create(
+        user=User.objects.create(username='bob'),
+        team=Team.objects.create(name='The Team')
+    )
+    context = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+
+    first = CachedUserProfileSerializer(instance=profile, context=context)
+    second = CachedUserProfileSerializer(instance=profile, context=context)
+
+    assert first.data == second.data == UserProfileSerializer(
+        instance=profile, context=context
+    ).data
+
+    assert '_field_plan' in CachedUserProfileSerializer.__dict__
+    assert '_field_plan' not in UserProfileSerializer.__dict__
+
+    assert first.fields['user'] is not second.fields['user']
+    assert first.fields['user'].parent is first
+    assert second.fields['friends'].parent is second
+    assert second.fields['friends'].child_relation.parent is \
+        second.fields['friends']
@@ -0,0 +1,191 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from rest_framework import serializers
+
+from hypermediachannels.includes import parse_include_paths
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username'
+        )
+
+
+class TeamSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = Team
+        fields = (
+            '@id',
+            'name'
+        )
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'team'
+        )
+
+
+class FriendSerializer(HyperChannelsApiModelSerializer):
+    profile = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'team',
+            'profile'
+        )
+
+        include = ('user', 'team')
+
+    def get_profile(self, instance):
+        return UserProfileSerializer(
+            instance=instance, context=self.context
+        ).data
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+
+    def filter_queryset(self, queryset, **kwargs):
+        return queryset.exclude(username='hidden')
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class TeamConsumer(GenericAsyncAPIConsumer):
+    serializer_class = TeamSerializer
+    queryset = Team.objects.all()
+
+    def get_queryset(self, **kwargs):
+        return Team.objects.exclude(name='Hidden')
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi(),
+        'teams': TeamConsumer.as_asgi()
+    }
+
+
+def get_context(*include):
+    return {
+        'scope': {'demultiplexer_cls': MainDemultiplexer},
+        'include': include
+    }
+
+
+def reference(stream, pk, **kwargs):
+    return dict({
+        'stream': stream,
+        'payload': {'action': 'retrieve', 'pk': pk}
+    }, **kwargs)
+
+
+def test_parse_include_paths():
+    assert parse_include_paths(('team', 'team.owner', 'user')) == {
+        'team': ('owner',),
+        'user': ()
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_include(django_assert_num_queries):
+    team = Team.objects.create(name='The Team')
+    profile = UserProfile.objects.create(
+        user=User.objects.create(username='bob'), team=team
+    )
+    profile = UserProfile.objects.get(pk=profile.pk)
+
+    # the user and team are loaded by the serializer (2 queries) and then
+    # each included with one query
+    with django_assert_num_queries(4):
+        data = UserProfileSerializer(
+            instance=profile, context=get_context('user', 'team')
+        ).data
+
+    assert data == {
+        '@id': reference('profiles', profile.pk),
+        'user': reference('users', profile.user.pk, data={
+            '@id': reference('users', profile.user.pk),
+            'username': 'bob'
+        }),
+        'team': reference('teams', team.pk, data={
+            '@id': reference('teams', team.pk),
+            'name': 'The Team'
+        })
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_nested_include():
+    team = Team.objects.create(name='The Team')
+    hidden = Team.objects.create(name='Hidden')
+    user = User.objects.create(username='bob')
+    profile = UserProfile.objects.create(user=user, team=hidden)
+
+    data = UserProfileSerializer(
+        instance=profile, context=get_context('team', '@id.user')
+    ).data
+    # included objects the consumer can not see are left as references
+    assert data['team'] == reference('teams', hidden.pk)
+    assert data['@id']['data']['user']['data']['username'] == 'bob'
+
+    profile.team = team
+    profile.save()
+    data = FriendSerializer(
+        instance=profile,
+        context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    ).data
+    assert data['team']['data']['name'] == 'The Team'
+    # nested serializers are not expanded
+    assert 'data' not in data['profile']['team']
+
+    user.username = 'hidden'
+    user.save()
+    data = UserProfileSerializer(
+        instance=profile, context=get_context('user')
+    ).data
+    # objects filtered out by the consumer's filter_queryset are left too
+    assert data['user'] == reference('users', user.pk)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_include_many(django_assert_num_queries, create_profiles):
+    profiles = create_profiles(3)
+
+    with django_assert_num_queries(3):
+        data = UserProfileSerializer(
+            instance=UserProfile.objects.order_by('pk'), many=True,
+            context=get_context('user')
+        ).data
+
+    # each item is included, with the paths applied within it
+    assert data == [
+        reference('profiles', profile.pk, data={
+            '@id': reference('profiles', profile.pk),
+            'user': reference('users', profile.user.pk, data={
+                '@id': reference('users', profile.user.pk),
+                'username': profile.user.username
+            }),
+            'team': reference('teams', profile.team.pk)
+        })
+        for profile in profiles
+    ]
@@ -0,0 +1,94 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+from hypermediachannels.instrumentation import FieldStats, instrument
+from hypermediachannels.resolution import clear_resolution_indexes
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'team',
+            'user',
+            'friends'
+        )
+
+        extra_kwargs = {
+            'team': {
+                'kwarg_mappings': {
+                    'team_pk': 'pk',
+                    'username': 'self.user.username'
+                }
+            }
+        }
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+
+
+class TeamConsumer(GenericAsyncAPIConsumer):
+    queryset = Team.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi(),
+        'teams': TeamConsumer.as_asgi()
+    }
+
+
+CONTEXT = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+
+
+@pytest.mark.django_db
+def test_field_stats(create_profiles):
+    profiles = create_profiles(2)
+    clear_resolution_indexes()
+
+    stats = FieldStats()
+    with instrument(stats):
+        for _ in range(2):
+            profile = UserProfile.objects.get(pk=profiles[0].pk)
+            UserProfileSerializer(instance=profile, context=CONTEXT).data
+        UserProfileSerializer(context=CONTEXT).fields[
+            'friends'
+        ].to_internal_value([profile.pk for profile in profiles])
+
+    totals = stats.totals
+    assert totals['UserProfileSerializer', 'user', 'to_representation'][
+        'references'
+    ] == 2
+    assert totals['UserProfileSerializer', 'friends', 'to_representation'][
+        'calls'
+    ] == 2
+
+    # the first resolution of the user model misses the index
+    resolve = totals['UserProfileSerializer', 'user', 'resolve']
+    assert (resolve['calls'], resolve['cache_hits']) == (2, 1)
+
+    # `self.user.username` loads the user of each profile
+    lookups = totals['UserProfileSerializer', 'team', 'extract_lookups']
+    assert (lookups['calls'], lookups['queries']) == (2, 2)
+    assert totals['UserProfileSerializer', 'team', 'to_representation'][
+        'queries'
+    ] == 2
+
+    internal = totals['UserProfileSerializer', 'friends', 'to_internal_value']
+    assert (internal['calls'], internal['references']) == (1, 2)
+    assert internal['queries'] == 1
+
+    # nothing is recorded once the hook is removed
+    stats.clear()
+    UserProfileSerializer(instance=profiles[0], context=CONTEXT).data
+    assert not stats.totals
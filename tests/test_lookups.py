@@ -0,0 +1,73 @@
+import pytest
+
+from hypermediachannels.lookups import compile_kwarg_mappings
+from tests.models import User, UserProfile, Team
+
+
+class Thing:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def get_label(self):
+        return 'label-{}'.format(self.name)
+
+
+def test_compiled_lookups():
+    lookups = compile_kwarg_mappings({
+        'name': 'name',
+        'label': 'get_label',
+        'owner': 'extra.owner',
+        'parent_name': 'self.name',
+        'parent': 'self'
+    })
+
+    child = Thing(name='child', extra={'owner': 'bob'})
+    parent = Thing(name='parent')
+
+    assert lookups.needs_parent
+    assert lookups(child, parent) == {
+        'name': 'child',
+        'label': 'label-child',
+        'owner': 'bob',
+        'parent_name': 'parent',
+        'parent': parent
+    }
+
+
+def test_compiled_lookups_are_shared():
+    lookups = compile_kwarg_mappings({'pk': 'pk'})
+
+    assert lookups is compile_kwarg_mappings({'pk': 'pk'})
+    assert not lookups.needs_parent
+    assert [accessor.attrs for accessor in lookups] == [('pk',)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_foreign_key_shortcut(django_assert_num_queries):
+    team = Team.objects.create(
+        name='The Team'
+    )
+
+    profile = UserProfile.objects.create(
+        user=User.objects.create(username='bob'),
+        team=team
+    )
+    profile = UserProfile.objects.get(pk=profile.pk)
+
+    lookups = compile_kwarg_mappings({
+        'team_pk': 'team.pk',
+        'team_id': 'team.id',
+        'user_pk': 'self.user.pk'
+    })
+
+    with django_assert_num_queries(0):
+        assert lookups(profile, profile) == {
+            'team_pk': team.pk,
+            'team_id': team.pk,
+            'user_pk': profile.user_id
+        }
+
+    with django_assert_num_queries(1):
+        assert compile_kwarg_mappings({'name': 'team.name'})(profile) == {
+            'name': 'The Team'
+        }
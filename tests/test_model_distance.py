@@ -0,0 +1,50 @@
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+from hypermediachannels.resolution import (
+    get_model_distance,
+    get_resolution_index
+)
+from tests.models import (
+    User, Staff, TeamLead, ActiveUser, Contractor, Team
+)
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+
+
+class StaffConsumer(GenericAsyncAPIConsumer):
+    queryset = Staff.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer,
+        'staff': StaffConsumer
+    }
+
+
+def test_distance():
+    assert get_model_distance(User, User) == 0
+    assert get_model_distance(Staff, User) == 1
+    assert get_model_distance(TeamLead, Staff) == 1
+    assert get_model_distance(TeamLead, User) == 2
+    assert get_model_distance(ActiveUser, User) == 1
+    assert get_model_distance(User, Staff) is None
+    assert get_model_distance(Team, User) is None
+
+    assert get_model_distance(Contractor, Staff) < get_model_distance(
+        Contractor, User
+    )
+
+
+def test_most_specific_stream_wins():
+    index = get_resolution_index(MainDemultiplexer)
+
+    assert index.resolve(User)[0] == 'users'
+    assert index.resolve(ActiveUser)[0] == 'users'
+    assert index.resolve(Staff)[0] == 'staff'
+    assert index.resolve(TeamLead)[0] == 'staff'
+    assert index.resolve(Contractor)[0] == 'staff'
+    assert index.resolve(Team) == (None, None)
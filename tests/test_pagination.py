@@ -0,0 +1,215 @@
+import datetime
+
+import pytest
+from channels.db import database_sync_to_async
+from channels.testing.websocket import WebsocketCommunicator
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from django.utils import timezone
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from rest_framework.exceptions import ValidationError
+
+from hypermediachannels.consumers import KeysetListModelMixin
+from hypermediachannels.pagination import paginate_keyset
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username'
+        )
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'friends'
+        )
+
+        extra_kwargs = {
+            'friends': {
+                'page_size': 2,
+                'kwarg_mappings': {
+                    'friend_of': 'self.pk'
+                }
+            }
+        }
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+
+
+class UserProfileConsumer(KeysetListModelMixin, GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+    page_ordering = '-user__username'
+
+    def get_queryset(self, friend_of=None, **kwargs):
+        if friend_of is None:
+            return UserProfile.objects.all()
+        return UserProfile.objects.filter(friended__pk=friend_of)
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi()
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_paginate_keyset(django_assert_num_queries):
+    users = [
+        User.objects.create(username=name)
+        for name in ('b', 'a', 'c', 'a2', 'b')
+    ]
+
+    pages = []
+    cursor = None
+    while True:
+        with django_assert_num_queries(1):
+            page, cursor = paginate_keyset(
+                User.objects.all(), 2, cursor, ordering='username'
+            )
+        pages.append(page)
+        if cursor is None:
+            break
+
+    assert pages == [
+        [users[1], users[3]], [users[0], users[4]], [users[2]]
+    ]
+
+    with pytest.raises(ValidationError):
+        paginate_keyset(User.objects.all(), 2, 'not a cursor')
+    with pytest.raises(ValidationError):
+        paginate_keyset(User.objects.all(), 0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_paginate_keyset_microseconds(create_profiles):
+    profiles = create_profiles(6)
+    start = timezone.now()
+    for (index, profile) in enumerate(profiles):
+        # closer than the milliseconds DjangoJSONEncoder keeps
+        UserProfile.objects.filter(pk=profile.pk).update(
+            created=start + datetime.timedelta(microseconds=100 * index)
+        )
+
+    for ordering in ('created', '-created'):
+        pages = []
+        cursor = None
+        while True:
+            page, cursor = paginate_keyset(
+                UserProfile.objects.all(), 2, cursor, ordering=ordering
+            )
+            pages.append([profile.pk for profile in page])
+            if cursor is None or len(pages) > len(profiles):
+                break
+
+        expected = [profile.pk for profile in profiles]
+        if ordering.startswith('-'):
+            expected.reverse()
+        assert pages == [expected[0:2], expected[2:4], expected[4:6]]
+
+
+def paginate_all(queryset, page_size, ordering):
+    pages = []
+    cursor = None
+    while True:
+        page, cursor = paginate_keyset(queryset, page_size, cursor, ordering)
+        pages.append([instance.pk for instance in page])
+        if cursor is None or len(pages) > queryset.count():
+            return pages
+
+
+@pytest.mark.django_db(transaction=True)
+def test_paginate_keyset_foreign_key(create_profiles):
+    profiles = create_profiles(3)
+    other = Team.objects.create(name='Other Team')
+    UserProfile.objects.filter(pk=profiles[0].pk).update(team=other)
+
+    assert paginate_all(UserProfile.objects.all(), 2, 'team') == [
+        [profiles[1].pk, profiles[2].pk], [profiles[0].pk]
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_paginate_keyset_null(create_profiles):
+    profiles = create_profiles(4)
+    UserProfile.objects.filter(pk=profiles[1].pk).update(user=None)
+    pks = [profile.pk for profile in profiles]
+
+    # NULL sorts first in ascending and last in descending order
+    assert paginate_all(UserProfile.objects.all(), 2, 'user__username') == [
+        [pks[1], pks[0]], [pks[2], pks[3]]
+    ]
+    assert paginate_all(UserProfile.objects.all(), 1, '-user__username') == [
+        [pks[3]], [pks[2]], [pks[0]], [pks[1]]
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_page_size_reference(create_profiles):
+    profile = create_profiles(1)[0]
+
+    data = UserProfileSerializer(
+        instance=profile,
+        context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    ).data
+
+    assert data['friends'] == {
+        'stream': 'profiles',
+        'payload': {
+            'action': 'list',
+            'friend_of': profile.pk,
+            'page_size': 2
+        }
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_keyset_list(create_profiles):
+    def setup():
+        profiles = create_profiles(5)
+        profiles[0].friends.set(profiles[1:])
+        return profiles
+
+    profiles = await database_sync_to_async(setup)()
+
+    communicator = WebsocketCommunicator(MainDemultiplexer.as_asgi(), '/')
+    connected, _ = await communicator.connect()
+    assert connected
+
+    payload = {
+        'action': 'list',
+        'friend_of': profiles[0].pk,
+        'page_size': 3
+    }
+    pages = []
+    while True:
+        await communicator.send_json_to({
+            'stream': 'profiles',
+            'payload': dict(payload, request_id=len(pages))
+        })
+        data = (await communicator.receive_json_from())['payload']['data']
+        pages.append([
+            reference['payload']['pk'] for reference in data['results']
+        ])
+        if data['cursor'] is None:
+            break
+        payload['cursor'] = data['cursor']
+
+    await communicator.disconnect()
+
+    assert pages == [
+        [profiles[4].pk, profiles[3].pk, profiles[2].pk],
+        [profiles[1].pk]
+    ]
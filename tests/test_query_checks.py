@@ -0,0 +1,79 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from django.test import override_settings
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+from hypermediachannels.querycheck import NPlusOneWarning, QueryBudgetExceeded
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import UserProfile
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'team'
+        )
+
+        many_kwarg_mappings = {
+            'username': 'user.username'
+        }
+
+        query_budget = 1
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'profiles': UserProfileConsumer.as_asgi()
+    }
+
+
+CONTEXT = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+
+
+@pytest.fixture
+def profiles(db, create_profiles):
+    return create_profiles(3)
+
+
+@override_settings(HYPERMEDIA_QUERY_CHECKS=True)
+def test_n_plus_one(profiles):
+    # a list skips the query plan, so each profile loads its user
+    loaded = list(UserProfile.objects.order_by('pk'))
+    serializer = UserProfileSerializer(
+        instance=loaded, many=True, context=CONTEXT
+    )
+    with pytest.warns(NPlusOneWarning) as record:
+        with pytest.raises(QueryBudgetExceeded) as excinfo:
+            serializer.data
+
+    assert len(record) == 1
+    message = str(record[0].message)
+    assert message.startswith(
+        "N+1 queries in UserProfileSerializer(many=True) following "
+        "'user.username', run for 3 items"
+    )
+    assert str(excinfo.value).startswith('3 queries exceed the budget of 1')
+
+    # the query plan selects the users along with the profiles
+    serializer = UserProfileSerializer(
+        instance=UserProfile.objects.order_by('pk'), many=True,
+        context=CONTEXT
+    )
+    assert len(serializer.data) == 3
+
+
+@override_settings(HYPERMEDIA_QUERY_CHECKS=False)
+def test_disabled(profiles):
+    loaded = list(UserProfile.objects.order_by('pk'))
+    serializer = UserProfileSerializer(
+        instance=loaded, many=True, context=CONTEXT
+    )
+    assert len(serializer.data) == 3
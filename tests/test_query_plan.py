@@ -0,0 +1,272 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from rest_framework import serializers
+
+from hypermediachannels.fields import HyperChannelsApiRelationField
+from hypermediachannels.planning import QueryPlan
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username'
+        )
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    team = HyperChannelsApiRelationField(
+        read_only=True,
+        kwarg_mappings={
+            'name': 'name',
+            'username': 'self.user.username'
+        }
+    )
+
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'team',
+            'friends'
+        )
+
+        many_kwarg_mappings = {
+            'pk': 'pk',
+            'team_pk': 'team.pk',
+            'username': 'user.username'
+        }
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class TeamConsumer(GenericAsyncAPIConsumer):
+    queryset = Team.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer,
+        'profiles': UserProfileConsumer,
+        'teams': TeamConsumer
+    }
+
+
+def test_query_plan():
+    assert UserSerializer.get_query_plan() == QueryPlan(
+        User,
+        only=('id', 'username')
+    )
+
+    assert UserProfileSerializer.get_query_plan() == QueryPlan(
+        UserProfile,
+        select_related=('user', 'team'),
+        only=(
+            'id', 'user', 'user__id', 'user__username',
+            'team', 'team__id', 'team__name'
+        )
+    )
+
+    assert UserProfileSerializer.get_many_query_plan() == QueryPlan(
+        UserProfile,
+        select_related=('user',),
+        only=('id', 'team', 'user', 'user__username')
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_list_applies_plan(django_assert_num_queries):
+    team = Team.objects.create(
+        name='The Team'
+    )
+    for index in range(5):
+        UserProfile.objects.create(
+            user=User.objects.create(username='user{}'.format(index)),
+            team=team
+        )
+
+    with django_assert_num_queries(1):
+        data = UserProfileSerializer(
+            instance=UserProfile.objects.all(),
+            many=True,
+            context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+        ).data
+
+    assert [item['payload']['username'] for item in data] == [
+        'user0', 'user1', 'user2', 'user3', 'user4'
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_list_of_combined_querysets():
+    team = Team.objects.create(
+        name='The Team'
+    )
+    for index in range(4):
+        UserProfile.objects.create(
+            user=User.objects.create(username='user{}'.format(index)),
+            team=team
+        )
+
+    # select_related() and only() are not supported after union()
+    queryset = UserProfile.objects.filter(
+        user__username__in=['user0', 'user1']
+    ).union(UserProfile.objects.filter(user__username='user3'))
+    data = UserProfileSerializer(
+        instance=queryset.order_by('pk'),
+        many=True,
+        context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    ).data
+
+    assert [item['payload']['username'] for item in data] == [
+        'user0', 'user1', 'user3'
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_optimize_queryset(django_assert_num_queries):
+    team = Team.objects.create(
+        name='The Team'
+    )
+    profile = UserProfile.objects.create(
+        user=User.objects.create(username='bob'),
+        team=team
+    )
+
+    with django_assert_num_queries(1):
+        data = UserProfileSerializer(
+            instance=UserProfileSerializer.optimize_queryset(
+                UserProfile.objects.all()
+            ).get(pk=profile.pk),
+            context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+        ).data
+
+    assert data['team'] == {
+        'stream': 'teams',
+        'payload': {
+            'action': 'retrieve',
+            'name': 'The Team',
+            'username': 'bob'
+        }
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_list_projects_local_columns(django_assert_num_queries):
+
+    class ProfileReferenceSerializer(HyperChannelsApiModelSerializer):
+        class Meta:
+            model = UserProfile
+            fields = (
+                '@id',
+            )
+
+            many_kwarg_mappings = {
+                'pk': 'pk',
+                'team_pk': 'team.pk'
+            }
+
+    team = Team.objects.create(
+        name='The Team'
+    )
+    profile = UserProfile.objects.create(
+        user=User.objects.create(username='bob'),
+        team=team
+    )
+
+    with django_assert_num_queries(1) as captured:
+        data = ProfileReferenceSerializer(
+            instance=UserProfile.objects.all(),
+            many=True,
+            context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+        ).data
+
+    assert 'created' not in captured.captured_queries[0]['sql']
+    assert data == [
+        {
+            'stream': 'profiles',
+            'payload': {
+                'action': 'retrieve',
+                'pk': profile.pk,
+                'team_pk': team.pk
+            }
+        }
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_list_of_distinct_queryset(create_profiles):
+
+    class ProfileTeamSerializer(HyperChannelsApiModelSerializer):
+        class Meta:
+            model = UserProfile
+            fields = (
+                '@id',
+            )
+
+            many_kwarg_mappings = {
+                'team_pk': 'team.pk'
+            }
+
+    profiles = create_profiles(3)
+
+    data = ProfileTeamSerializer(
+        instance=UserProfile.objects.distinct(),
+        many=True,
+        context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    ).data
+
+    assert len(data) == 3
+    assert data[0]['payload'] == {
+        'action': 'retrieve',
+        'team_pk': profiles[0].team.pk
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_plain_many_field_prefetched(django_assert_num_queries,
+                                     create_profiles):
+
+    class FriendPksSerializer(HyperChannelsApiModelSerializer):
+        friend_pks = serializers.PrimaryKeyRelatedField(
+            source='friends', many=True, read_only=True
+        )
+
+        class Meta:
+            model = UserProfile
+            fields = (
+                'friend_pks',
+            )
+
+    assert FriendPksSerializer.get_query_plan() == QueryPlan(
+        UserProfile,
+        prefetch_related=('friends',),
+        only=('id',)
+    )
+
+    profiles = create_profiles(3)
+    profiles[0].friends.set(profiles[1:])
+
+    # the profiles and their friends, rather than a query per profile
+    with django_assert_num_queries(2):
+        data = [
+            FriendPksSerializer(instance=profile).data
+            for profile in FriendPksSerializer.optimize_queryset(
+                UserProfile.objects.order_by('pk')
+            )
+        ]
+
+    assert data[0] == {'friend_pks': [profiles[1].pk, profiles[2].pk]}
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+from hypermediachannels.consumers import HyperMediaConsumerMixin
+from hypermediachannels.references import Reference
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'team'
+        )
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+
+
+class UserProfileConsumer(HyperMediaConsumerMixin, GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class TeamConsumer(GenericAsyncAPIConsumer):
+    queryset = Team.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer,
+        'profiles': UserProfileConsumer,
+        'teams': TeamConsumer
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lazy_references():
+    team = Team.objects.create(name='The Team')
+    profiles = [
+        UserProfile.objects.create(
+            user=User.objects.create(username='user{}'.format(index)),
+            team=team
+        )
+        for index in range(2)
+    ]
+
+    scope = {'demultiplexer_cls': MainDemultiplexer}
+    expected = [
+        UserProfileSerializer(instance=profile, context={'scope': scope}).data
+        for profile in profiles
+    ]
+
+    consumer = UserProfileConsumer()
+    consumer.scope = scope
+    data = [
+        consumer.get_serializer(instance=profile, action_kwargs={}).data
+        for profile in profiles
+    ]
+
+    assert isinstance(data[0]['team'], Reference)
+    assert data == expected
+    # both profiles share the same team reference and template
+    assert data[0]['team'] == data[1]['team']
+    assert data[0]['user'].template is data[1]['user'].template
+
+    assert json.loads(
+        async_to_sync(UserProfileConsumer.encode_json)(data)
+    ) == json.loads(json.dumps(expected))
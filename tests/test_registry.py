@@ -0,0 +1,120 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from django.core.exceptions import ImproperlyConfigured
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from djangochannelsrestframework.mixins import (
+    ListModelMixin,
+    RetrieveModelMixin
+)
+
+from hypermediachannels.registry import build_registry
+from hypermediachannels.resolution import (
+    clear_resolution_indexes,
+    get_resolution_index
+)
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'team',
+            'friends'
+        )
+
+        extra_kwargs = {
+            'team': {
+                'kwarg_mappings': {
+                    'team_pk': 'pk',
+                    'username': 'self.user.username'
+                }
+            }
+        }
+
+        many_kwarg_mappings = {
+            'username': 'user.username'
+        }
+
+
+class BrokenUserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'team'
+        )
+
+        extra_kwargs = {
+            'user': {'stream_name': 'people'},
+            'team': {
+                'kwarg_mappings': {
+                    'nickname': 'self.user.nickname'
+                }
+            }
+        }
+
+
+class UserConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+
+
+class TeamConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = Team.objects.all()
+
+
+class UserProfileConsumer(ListModelMixin, RetrieveModelMixin,
+                          GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class BrokenUserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = BrokenUserProfileSerializer
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'teams': TeamConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi()
+    }
+
+
+class BrokenDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'teams': TeamConsumer.as_asgi(),
+        'profiles': BrokenUserProfileConsumer.as_asgi()
+    }
+
+
+def test_build_registry():
+    clear_resolution_indexes()
+    assert build_registry([MainDemultiplexer]) == []
+
+    resolved = get_resolution_index(MainDemultiplexer).entries
+    assert resolved[UserProfile][0] == 'profiles'
+    assert resolved[Team][0] == 'teams'
+
+
+def test_invalid_configuration():
+    assert build_registry([BrokenDemultiplexer], fail=False) == [
+        "BrokenDemultiplexer: BrokenUserProfileSerializer.@id: action "
+        "'retrieve' is not supported on stream 'profiles'",
+        "BrokenDemultiplexer: BrokenUserProfileSerializer.user: stream "
+        "'people' is not one of the applications",
+        "BrokenDemultiplexer: BrokenUserProfileSerializer.team: lookup "
+        "'self.user.nickname' of 'nickname': User has no field or "
+        "attribute 'nickname'",
+        "BrokenDemultiplexer: BrokenUserProfileSerializer(many=True): "
+        "action 'retrieve' is not supported on stream 'profiles'",
+    ]
+
+    with pytest.raises(ImproperlyConfigured):
+        build_registry([BrokenDemultiplexer])
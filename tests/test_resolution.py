@@ -0,0 +1,98 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+from hypermediachannels.resolution import (
+    clear_resolution_indexes,
+    get_resolution_index,
+    warm_resolution_index
+)
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile, Team
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username'
+        )
+
+
+class UserConsumer(GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'profiles': UserProfileConsumer
+    }
+
+
+def test_warm_index():
+    index = warm_resolution_index(MainDemultiplexer)
+
+    assert index is get_resolution_index(MainDemultiplexer)
+    assert index.entries[User] == (
+        'users', MainDemultiplexer.applications['users']
+    )
+    assert index.entries[UserProfile] == ('profiles', UserProfileConsumer)
+    assert index.entries[Team] == (None, None)
+
+
+def test_index_invalidated_when_applications_change():
+
+    class Demultiplexer(AsyncJsonWebsocketDemultiplexer):
+        applications = {
+            'users': UserConsumer
+        }
+
+    index = get_resolution_index(Demultiplexer)
+    assert index.resolve(User) == ('users', UserConsumer)
+
+    Demultiplexer.applications['active_users'] = UserConsumer
+    assert get_resolution_index(Demultiplexer) is not index
+
+    # the same number of streams needs an explicit clear
+    index = get_resolution_index(Demultiplexer)
+    Demultiplexer.applications.pop('users')
+    Demultiplexer.applications['other_users'] = UserConsumer
+    assert get_resolution_index(Demultiplexer) is index
+
+    clear_resolution_indexes()
+    assert get_resolution_index(Demultiplexer).resolve(User) == (
+        'active_users', UserConsumer
+    )
+
+    Demultiplexer.applications = {'users': UserConsumer}
+    assert get_resolution_index(Demultiplexer).resolve(User) == (
+        'users', UserConsumer
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_serializer_uses_index():
+    user = User.objects.create(
+        username='bob'
+    )
+
+    data = UserSerializer(
+        instance=user,
+        context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    ).data
+
+    assert data['@id'] == {
+        'stream': 'users',
+        'payload': {
+            'pk': user.pk,
+            'action': 'retrieve'
+        }
+    }
+    assert User in get_resolution_index(MainDemultiplexer).entries
@@ -0,0 +1,101 @@
+import pytest
+from channels.db import database_sync_to_async
+from channels.testing.websocket import WebsocketCommunicator
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+
+from hypermediachannels.consumers import StreamingListModelMixin
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username'
+        )
+
+        stream_chunk_size = 2
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+        )
+
+        many_kwarg_mappings = {
+            'username': 'user.username'
+        }
+
+
+class UserConsumer(StreamingListModelMixin, GenericAsyncAPIConsumer):
+    queryset = User.objects.order_by('pk')
+    serializer_class = UserSerializer
+    stream_ordering = '-pk'
+
+
+class UserProfileConsumer(GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.order_by('pk')
+    serializer_class = UserProfileSerializer
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi()
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_iter_representation(create_profiles):
+    create_profiles(5)
+    context = {'scope': {'demultiplexer_cls': MainDemultiplexer}}
+
+    for (serializer_cls, queryset) in (
+            (UserSerializer, User.objects.order_by('pk')),
+            (UserProfileSerializer, UserProfile.objects.order_by('pk'))):
+        serializer = serializer_cls(
+            instance=queryset, many=True, context=context
+        )
+        chunks = list(serializer.iter_representation(queryset, chunk_size=2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert [
+            item for chunk in chunks for item in chunk
+        ] == serializer.data
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+async def test_stream_list(create_profiles):
+    profiles = await database_sync_to_async(create_profiles)(3)
+
+    communicator = WebsocketCommunicator(MainDemultiplexer.as_asgi(), '/')
+    connected, _ = await communicator.connect()
+    assert connected
+
+    await communicator.send_json_to({
+        'stream': 'users',
+        # a client `cursor` is an action kwarg like any other
+        'payload': {'action': 'stream_list', 'request_id': 1, 'cursor': 'x'}
+    })
+
+    frames = [await communicator.receive_json_from() for _ in range(3)]
+    await communicator.disconnect()
+
+    assert [frame['payload']['response_status'] for frame in frames] == [
+        206, 206, 200
+    ]
+    assert frames[-1]['payload']['data'] == {'sequence': 2, 'end': True}
+    assert [
+        frame['payload']['data']['sequence'] for frame in frames[:-1]
+    ] == [0, 1]
+    assert [
+        reference['payload']['pk']
+        for frame in frames[:-1]
+        for reference in frame['payload']['data']['results']
+    ] == [profile.user.pk for profile in reversed(profiles)]
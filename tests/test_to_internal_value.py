@@ -0,0 +1,133 @@
+import pytest
+from channelsmultiplexer import AsyncJsonWebsocketDemultiplexer
+from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
+from djangochannelsrestframework.mixins import RetrieveModelMixin
+from rest_framework.exceptions import ValidationError
+
+from hypermediachannels.serializers import HyperChannelsApiModelSerializer
+from tests.models import User, UserProfile
+
+
+class UserSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = User
+        fields = (
+            '@id',
+            'username'
+        )
+
+
+class UserProfileSerializer(HyperChannelsApiModelSerializer):
+    class Meta:
+        model = UserProfile
+        fields = (
+            '@id',
+            'user',
+            'friends'
+        )
+
+
+class UserConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = User.objects.all()
+    serializer_class = UserSerializer
+
+
+class UserProfileConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
+
+
+class ScopedUserProfileConsumer(RetrieveModelMixin, GenericAsyncAPIConsumer):
+    serializer_class = UserProfileSerializer
+
+    def get_queryset(self, **kwargs):
+        return UserProfile.objects.filter(user__username__startswith='user')
+
+
+class MainDemultiplexer(AsyncJsonWebsocketDemultiplexer):
+    applications = {
+        'users': UserConsumer.as_asgi(),
+        'profiles': UserProfileConsumer.as_asgi(),
+        'scoped_profiles': ScopedUserProfileConsumer.as_asgi()
+    }
+
+
+def get_field(name):
+    return UserProfileSerializer(
+        context={'scope': {'demultiplexer_cls': MainDemultiplexer}}
+    ).fields[name]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_many_pks_single_query(django_assert_num_queries, create_profiles):
+    profiles = create_profiles(4)
+    pks = [profiles[2].pk, profiles[0].pk, profiles[3].pk, profiles[0].pk]
+
+    field = get_field('friends')
+
+    with django_assert_num_queries(1):
+        values = field.to_internal_value(pks)
+
+    assert values == [profiles[2], profiles[0], profiles[3], profiles[0]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_many_pks_missing(create_profiles):
+    profiles = create_profiles(1)
+
+    field = get_field('friends')
+
+    with pytest.raises(ValidationError) as excinfo:
+        field.to_internal_value([profiles[0].pk, 9998, 9999])
+
+    assert excinfo.value.detail == ['Not found: 9998, 9999']
+
+
+def reference(stream, pk):
+    return {
+        'stream': stream,
+        'payload': {'action': 'retrieve', 'pk': pk}
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reference(create_profiles):
+    profiles = create_profiles(1)
+
+    field = get_field('user')
+
+    assert field.to_internal_value(
+        reference('users', profiles[0].user.pk)
+    ) == profiles[0].user
+
+    with pytest.raises(ValidationError) as excinfo:
+        field.to_internal_value(reference('users', 9999))
+    assert excinfo.value.detail == ['Not found']
+
+    with pytest.raises(ValidationError) as excinfo:
+        field.to_internal_value(reference('teams', 1))
+    assert excinfo.value.detail == ['stream teams not found.']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_many_references_batched(django_assert_num_queries, create_profiles):
+    profiles = create_profiles(4)
+
+    field = get_field('friends')
+
+    with django_assert_num_queries(4):
+        values = field.to_internal_value([
+            reference('profiles', profiles[1].pk),
+            profiles[0].pk,
+            reference('scoped_profiles', profiles[2].pk),
+            reference('profiles', profiles[3].pk),
+            reference('scoped_profiles', profiles[0].pk),
+            reference('profiles', profiles[1].pk),
+        ])
+
+    # one query for the pks, one for the `profiles` stream and one per
+    # `scoped_profiles` reference since it overrides `get_queryset`
+    assert values == [
+        profiles[1], profiles[0], profiles[2],
+        profiles[3], profiles[0], profiles[1]
+    ]